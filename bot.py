@@ -13,7 +13,6 @@ from telegram.ext import (
     Application, CommandHandler, CallbackQueryHandler,
     MessageHandler, filters, ContextTypes
 )
-from telegram.helpers import escape_markdown
 from telegram.constants import ParseMode
 from telegram.error import BadRequest
 import threading
@@ -21,8 +20,12 @@ from flask import Flask, jsonify, request, redirect, send_from_directory
 from datetime import datetime, timedelta, timezone, time
 import time
 import asyncio
-from functools import lru_cache
+from functools import lru_cache, partial
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import html
+import re
 
 # FIX: moved logger setup to top
 logging.basicConfig(
@@ -30,6 +33,10 @@ logging.basicConfig(
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
+# Per-request access lines from the Flask thread and httpx (every Bot API call) cost
+# GIL time on the callback path; keep only their warnings
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
+logging.getLogger('httpx').setLevel(logging.WARNING)
 
 # Load environment variables first
 load_dotenv()
@@ -39,6 +46,12 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 TOKEN = os.getenv('TOKEN')
 CHANNEL_ID = int(os.getenv('CHANNEL_ID', 0))
 BOT_USERNAME = os.getenv('BOT_USERNAME')
+# Deep-link prefix for profile buttons/links, built once instead of per rendered comment
+BOT_URL = f"https://t.me/{BOT_USERNAME}"
+PROFILE_URL_PREFIX = f"{BOT_URL}?start=profileid_"
+COMMENTS_URL_PREFIX = f"{BOT_URL}?start=comments_"
+# Constant tail of every approved channel post, appended after the hashtags
+CHANNEL_POST_FOOTER = f"<a href='https://t.me/christianvent'>Telegram</a> | <a href='{BOT_URL}'>Bot</a>"
 ADMIN_ID = os.getenv('ADMIN_ID')
 # Add color variables near the top of bot.py (after loading env)
 PRIMARY_COLOR = os.getenv('PRIMARY_COLOR')
@@ -428,6 +441,18 @@ def init_db():
                     logger.info("Adding missing column: deleted to posts table")
                     c.execute("ALTER TABLE posts ADD COLUMN deleted BOOLEAN DEFAULT FALSE")
 
+                # Indexes for the hot comment/reaction lookups (like/dislike counts, thread loads)
+                c.execute("CREATE INDEX IF NOT EXISTS idx_reactions_comment_type ON reactions (comment_id, type)")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (post_id)")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_comments_parent ON comments (parent_comment_id)")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_comments_author ON comments (author_id)")
+                # The followers primary key only covers follower_id-first lookups
+                c.execute("CREATE INDEX IF NOT EXISTS idx_followers_followed ON followers (followed_id)")
+                # My Posts pages and the per-author aura counts filter posts by author, newest first
+                c.execute("CREATE INDEX IF NOT EXISTS idx_posts_author ON posts (author_id, timestamp DESC)")
+                # Aura subtracts blocks received; the primary key is blocker_id-first
+                c.execute("CREATE INDEX IF NOT EXISTS idx_blocks_blocked ON blocks (blocked_id)")
+
                 # ---------------- Create admin user if specified ----------------
                 if ADMIN_ID:
                     c.execute('''
@@ -444,36 +469,21 @@ def init_db():
 def assign_vent_numbers_to_existing_posts():
     """Assign vent numbers to existing approved posts"""
     try:
-        # Get all approved posts without vent numbers
-        posts = db_fetch_all(
-            "SELECT post_id FROM posts WHERE approved = TRUE AND vent_number IS NULL ORDER BY timestamp ASC"
-        )
+        # Number all approved posts without vent numbers after the current max, in one statement
+        posts = db_fetch_all("""
+            UPDATE posts p SET vent_number = m.max_num + n.rn
+            FROM (
+                SELECT post_id, ROW_NUMBER() OVER (ORDER BY timestamp ASC) AS rn
+                FROM posts WHERE approved = TRUE AND vent_number IS NULL
+            ) n,
+            (SELECT COALESCE(MAX(vent_number), 0) AS max_num FROM posts WHERE approved = TRUE) m
+            WHERE p.post_id = n.post_id
+            RETURNING p.post_id
+        """)
         
         if not posts:
             return
         
-        # Get current max vent number
-        max_vent = db_fetch_one("SELECT MAX(vent_number) as max_num FROM posts WHERE approved = TRUE")
-        next_vent_number = (max_vent['max_num'] or 0) + 1
-        
-        # Assign numbers sequentially
-        for post in posts:
-            db_execute(
-                "UPDATE posts SET vent_number = %s WHERE post_id = %s",
-                (next_vent_number, post['post_id'])
-            )
-            
-            # Try to update the channel post if it exists
-            post_data = db_fetch_one(
-                "SELECT content, category, channel_message_id FROM posts WHERE post_id = %s",
-                (post['post_id'],)
-            )
-            
-            if post_data and post_data['channel_message_id']:
-                logger.info(f"Post {post['post_id']} should be updated to Vent - {next_vent_number:03d}")
-            
-            next_vent_number += 1
-        
         logger.info(f"Assigned vent numbers to {len(posts)} existing posts")
         
     except Exception as e:
@@ -491,21 +501,17 @@ async def fix_vent_numbers(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔄 Reassigning vent numbers to all approved posts...")
     
     try:
-        # Reset all vent numbers first
-        db_execute("UPDATE posts SET vent_number = NULL WHERE approved = TRUE")
-        
-        # Get all approved posts in chronological order
-        posts = db_fetch_all(
-            "SELECT post_id FROM posts WHERE approved = TRUE ORDER BY timestamp ASC"
-        )
-        
-        count = 0
-        for idx, post in enumerate(posts, start=1):
-            db_execute(
-                "UPDATE posts SET vent_number = %s WHERE post_id = %s",
-                (idx, post['post_id'])
-            )
-            count += 1
+        # Renumber all approved posts in chronological order with one UPDATE
+        posts = db_fetch_all("""
+            UPDATE posts p SET vent_number = n.rn
+            FROM (
+                SELECT post_id, ROW_NUMBER() OVER (ORDER BY timestamp ASC) AS rn
+                FROM posts WHERE approved = TRUE
+            ) n
+            WHERE p.post_id = n.post_id
+            RETURNING p.post_id
+        """)
+        count = len(posts)
         
         await update.message.reply_text(f"✅ Successfully assigned vent numbers to {count} posts.")
         
@@ -528,6 +534,7 @@ async def fix_missing_sex(update: Update, context: ContextTypes.DEFAULT_TYPE):
         WHERE (sex IS NULL OR sex = '') 
         AND avatar_emoji IS NOT NULL
     """)
+    invalidate_user()
     
     await update.message.reply_text(f"✅ Fixed missing sex for {rows_fixed} users.")
 
@@ -608,13 +615,23 @@ async def replace_with_error(loading_msg, error_text):
         return loading_msg
     except:
         return loading_msg
+
+async def edit_or_reply(query, text, **kwargs):
+    """Show text in place of the pressed message; reply instead if it can't be edited (e.g. media)"""
+    try:
+        return await query.edit_message_text(text, **kwargs)
+    except BadRequest as e:
+        if "Message is not modified" in str(e):
+            return query.message
+        return await query.message.reply_text(text, **kwargs)
 # Database helper functions - FIXED VERSION
 # -------------------- PostgreSQL Connection Pool --------------------
 from psycopg2 import pool
 
 # Create a global connection pool (reuses DB connections instead of reconnecting every time)
+# Threaded pool: the Flask mini app thread and the bot's event loop share it
 try:
-    db_pool = pool.SimpleConnectionPool(
+    db_pool = pool.ThreadedConnectionPool(
         1, 10,  # min 1, max 10 connections
         dsn=DATABASE_URL,
         cursor_factory=RealDictCursor
@@ -650,29 +667,236 @@ def db_execute(query, params=(), fetch=False, fetchone=False):
             db_pool.putconn(conn)
 
 
+@contextmanager
+def db_transaction():
+    """Yield a cursor whose statements are committed together, or rolled back on error."""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            yield cur
+        conn.commit()
+    except Exception as e:
+        logging.error(f"Database transaction error: {e}")
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+
 def db_fetch_one(query, params=()):
     return db_execute(query, params, fetchone=True)
 
 def db_fetch_all(query, params=()):
     return db_execute(query, params, fetch=True)
+
+# Dedicated worker threads for async DB calls. Kept below the pool max so the
+# Flask thread and the remaining sync helpers always have a connection left.
+db_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="db")
+
+async def run_db(func, *args):
+    """Run a blocking DB function on the DB executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, partial(func, *args))
+
+async def db_execute_async(query, params=(), fetch=False, fetchone=False):
+    """Run db_execute on the DB executor so the event loop is not blocked."""
+    return await run_db(db_execute, query, params, fetch, fetchone)
+
+async def db_fetch_one_async(query, params=()):
+    return await db_execute_async(query, params, fetchone=True)
+
+async def db_fetch_all_async(query, params=()):
+    return await db_execute_async(query, params, fetch=True)
+
+def get_users_by_ids(user_ids):
+    """Fetch several user rows keyed by user_id; cached rows are reused, misses share one WHERE IN query."""
+    wanted = {str(uid) for uid in user_ids if uid}
+    if not wanted:
+        return {}
+    now = time.monotonic()
+    users = {}
+    with user_cache_lock:
+        for uid in wanted:
+            entry = user_cache.get(uid)
+            if entry and entry[0] > now:
+                users[uid] = dict(entry[1])
+    ids = tuple(wanted - users.keys())
+    if ids:
+        begin_user_loads(ids)
+        rows = []
+        try:
+            rows = db_fetch_all("SELECT * FROM users WHERE user_id IN %s", (ids,))
+        finally:
+            finish_user_loads(ids, rows, now)
+        users.update((row['user_id'], dict(row)) for row in rows)
+    return users
+
+def get_comment_reaction_data(comment_ids, user_id):
+    """Like/dislike counts and the viewer's reaction for many comments in one grouped query."""
+    ids = tuple(set(comment_ids))
+    if not ids:
+        return {}
+    rows = db_fetch_all("""
+        SELECT comment_id,
+               COUNT(*) FILTER (WHERE type NOT IN ('dislike', '👎', '😡')) AS likes,
+               COUNT(*) FILTER (WHERE type IN ('dislike', '👎', '😡')) AS dislikes,
+               MAX(CASE WHEN user_id = %s THEN type END) AS user_reaction
+        FROM reactions WHERE comment_id IN %s
+        GROUP BY comment_id
+    """, (user_id, ids))
+    return {
+        row['comment_id']: {'likes': row['likes'], 'dislikes': row['dislikes'], 'user_reaction': row['user_reaction']}
+        for row in rows
+    }
+
+# user_id -> (expires_at, row), in insertion order so the front expires first.
+# Every write to users must go through update_user or call invalidate_user,
+# otherwise handlers could act on a stale waiting_* state.
+user_cache = OrderedDict()
+user_cache_lock = threading.Lock()
+USER_CACHE_TTL = 60
+USER_CACHE_MAX = 4096
+# user_id -> [loads in flight, invalidated meanwhile]; a row read before an
+# invalidation must not be cached after it
+user_cache_loads = {}
+
+def begin_user_loads(user_ids):
+    """Register in-flight cache-miss SELECTs so invalidate_user can flag them."""
+    with user_cache_lock:
+        for uid in user_ids:
+            state = user_cache_loads.setdefault(uid, [0, False])
+            state[0] += 1
+
+def finish_user_loads(user_ids, rows, now):
+    """Cache rows whose load saw no invalidation and unregister the loads."""
+    with user_cache_lock:
+        stale = set()
+        for uid in user_ids:
+            state = user_cache_loads[uid]
+            if state[1]:
+                stale.add(uid)
+            state[0] -= 1
+            if not state[0]:
+                del user_cache_loads[uid]
+        for row in rows:
+            if row['user_id'] not in stale:
+                user_cache.pop(row['user_id'], None)
+                user_cache[row['user_id']] = (now + USER_CACHE_TTL, row)
+        # Drop expired rows from the front, then the oldest beyond the cap
+        while user_cache:
+            uid, (expires_at, _) = next(iter(user_cache.items()))
+            if expires_at > now and len(user_cache) <= USER_CACHE_MAX:
+                break
+            del user_cache[uid]
+
+def get_user(user_id):
+    """Return the user's row, served from a short TTL cache. Misses are not cached."""
+    user_id = str(user_id)
+    now = time.monotonic()
+    with user_cache_lock:
+        entry = user_cache.get(user_id)
+        if entry and entry[0] > now:
+            return dict(entry[1])
+    begin_user_loads((user_id,))
+    row = None
+    try:
+        row = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+    finally:
+        finish_user_loads((user_id,), [row] if row else [], now)
+    return dict(row) if row else row
+
+def invalidate_user(user_id=None):
+    """Drop one cached user row, or all of them after a bulk update."""
+    with user_cache_lock:
+        if user_id is None:
+            user_cache.clear()
+            for state in user_cache_loads.values():
+                state[1] = True
+        else:
+            user_id = str(user_id)
+            user_cache.pop(user_id, None)
+            if user_id in user_cache_loads:
+                user_cache_loads[user_id][1] = True
+
+def update_user(user_id, **fields):
+    """UPDATE the given users columns and invalidate the cached row."""
+    assignments = ', '.join(f"{col} = %s" for col in fields)
+    try:
+        return db_execute(
+            f"UPDATE users SET {assignments} WHERE user_id = %s",
+            (*fields.values(), user_id)
+        )
+    finally:
+        invalidate_user(user_id)
+
+async def get_user_async(user_id):
+    """get_user for handlers: cache hits are served inline, misses run on the DB executor."""
+    user_id = str(user_id)
+    with user_cache_lock:
+        entry = user_cache.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return dict(entry[1])
+    return await run_db(get_user, user_id)
+
+async def update_user_async(user_id, **fields):
+    """Run update_user on the DB executor so the event loop is not blocked."""
+    return await run_db(partial(update_user, user_id, **fields))
+
+def get_follow_counts(user_id):
+    """Follower and following counts of a user in one indexed query."""
+    return db_fetch_one(
+        "SELECT COUNT(*) FILTER (WHERE followed_id = %s) AS followers, "
+        "COUNT(*) FILTER (WHERE follower_id = %s) AS following "
+        "FROM followers WHERE followed_id = %s OR follower_id = %s",
+        (user_id, user_id, user_id, user_id)
+    ) or {'followers': 0, 'following': 0}
+
+@lru_cache(maxsize=2048)
+def get_post_meta(post_id):
+    """Cached preview/author/channel message/deleted flag of a post. Treat the result as read-only."""
+    # Cleared on post insert, approval and deletion (hard or soft). Only a clipped preview is kept:
+    # 101 chars is enough for the 100-char previews plus their "..." length check.
+    return db_fetch_one(
+        "SELECT post_id, LEFT(content, 101) AS preview, author_id, channel_message_id, deleted FROM posts WHERE post_id = %s",
+        (post_id,)
+    )
+
+def clip_text(text, limit):
+    """First limit characters of text, with "..." appended when it was cut"""
+    return text[:limit] + '...' if len(text) > limit else text
+
+@lru_cache(maxsize=2048)
+def reply_preview_md(post_id):
+    """Clipped, MarkdownV2-escaped post preview for the "Replying to" prompt, or None"""
+    post = get_post_meta(post_id)
+    if not post:
+        return None
+    content = clip_text(post['preview'], 100)
+    return escape_markdown_v2(content)
+
+def clear_post_caches():
+    """Drop cached post metadata and previews after posts are inserted, approved or deleted."""
+    get_post_meta.cache_clear()
+    reply_preview_md.cache_clear()
+# users columns as reset_user_waiting_states leaves them
+CLEARED_WAITING_STATE = {
+    'waiting_for_post': False,
+    'waiting_for_comment': False,
+    'awaiting_name': False,
+    'waiting_for_private_message': False,
+    'awaiting_bio': False,
+    'selected_category': None,
+    'selected_categories': None,
+    'comment_post_id': None,
+    'comment_idx': None,
+    'private_message_target': None,
+    'thread_context_post_id': None,
+}
+
 async def reset_user_waiting_states(user_id: str, chat_id: int = None, context: ContextTypes.DEFAULT_TYPE = None):
     """Reset all waiting states for a user and optionally restore main menu"""
     # Reset database states
-    db_execute('''
-        UPDATE users 
-        SET waiting_for_post = FALSE, 
-            waiting_for_comment = FALSE, 
-            awaiting_name = FALSE,
-            waiting_for_private_message = FALSE,
-            awaiting_bio = FALSE,
-            selected_category = NULL,
-            selected_categories = NULL,
-            comment_post_id = NULL,
-            comment_idx = NULL,
-            private_message_target = NULL,
-            thread_context_post_id = NULL
-        WHERE user_id = %s
-    ''', (user_id,))
+    update_user(user_id, **CLEARED_WAITING_STATE)
     
     # Reset context flags
     if context:
@@ -730,14 +954,8 @@ async def adopt_orphaned_replies(context: ContextTypes.DEFAULT_TYPE, post_id: in
     """Helper to fix orphans and update channel count"""
     fixed_count = fix_orphaned_comments_for_post(post_id)
     
-    # Recalculate total count
-    new_count = count_all_comments(post_id)
-    
-    # Update DB column
-    db_execute("UPDATE posts SET comment_count = %s WHERE post_id = %s", (new_count, post_id))
-    
-    # Update channel button
-    await update_channel_post_comment_count(context, post_id)
+    # Resync the stored count and the channel button off the user's path
+    schedule_comment_count_refresh(context, post_id, recount=True)
     
     return fixed_count
 
@@ -754,8 +972,14 @@ async def recount_comments(update: Update, context: ContextTypes.DEFAULT_TYPE):
     status_msg = await update.message.reply_text("🔄 Scanning all posts and fixing comment counts...")
     
     try:
-        # Get all approved posts
-        posts = db_fetch_all("SELECT post_id FROM posts WHERE approved = TRUE")
+        # Get all approved posts with stored and actual comment counts in one aggregate
+        posts = db_fetch_all("""
+            SELECT p.post_id, p.comment_count, COUNT(c.comment_id) AS actual_count
+            FROM posts p
+            LEFT JOIN comments c ON c.post_id = p.post_id
+            WHERE p.approved = TRUE
+            GROUP BY p.post_id
+        """)
         
         posts_scanned = len(posts)
         posts_fixed = 0
@@ -769,23 +993,16 @@ async def recount_comments(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if fixed > 0:
                 orphans_adopted += fixed
                 
-            # Recalculate count
-            actual_count = count_all_comments(post_id)
-            
-            # Get current DB count
-            db_post = db_fetch_one("SELECT comment_count FROM posts WHERE post_id = %s", (post_id,))
-            current_db_count = db_post['comment_count'] if db_post else 0
+            actual_count = post['actual_count']
+            current_db_count = post['comment_count'] or 0
             
             if actual_count != current_db_count or fixed > 0:
                 # Update DB
                 db_execute("UPDATE posts SET comment_count = %s WHERE post_id = %s", (actual_count, post_id))
                 posts_fixed += 1
                 
-                # Update channel button if possible
-                try:
-                    await update_channel_post_comment_count(context, post_id)
-                except Exception as e:
-                    logger.error(f"Failed to update channel button for post {post_id}: {e}")
+                # Update channel button through the per-post refresh so edits don't overlap
+                schedule_comment_count_refresh(context, post_id)
                     
         report = (
             f"✅ *Comment Recount Complete*\n\n"
@@ -817,19 +1034,20 @@ CATEGORIES = [
     ("📖 Bible Question", "BibleQuestion"),
 ] 
 
-def build_category_buttons():
-    buttons = []
-    for i in range(0, len(CATEGORIES), 2):
-        row = []
-        for j in range(2):
-            if i + j < len(CATEGORIES):
-                name, code = CATEGORIES[i + j]
-                row.append(InlineKeyboardButton(name, callback_data=f'category_{code}'))
-        buttons.append(row)
-    return InlineKeyboardMarkup(buttons) 
+@lru_cache(maxsize=1024)
+def comments_kb(post_id, total_comments):
+    """Channel post keyboard with the comments deep-link button (markups are immutable, so cached)."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(f"💬 Add/view Comments ({total_comments})", url=f"{COMMENTS_URL_PREFIX}{post_id}")]
+    ])
 
 def build_multi_category_keyboard(selected_codes):
     """Return InlineKeyboardMarkup with checkboxes for given selected codes."""
+    return multi_category_keyboard(frozenset(selected_codes))
+
+@lru_cache(maxsize=256)
+def multi_category_keyboard(selected_codes):
+    """Cached markup behind build_multi_category_keyboard, one per distinct selection"""
     keyboard = []
     row = []
     for display, code in CATEGORIES:
@@ -858,6 +1076,8 @@ def build_multi_category_keyboard(selected_codes):
 
 # Initialize Flask app for Render health checks
 flask_app = Flask(__name__, static_folder='static')
+# The mini app reads fields by name, so skip re-sorting every response's keys
+flask_app.json.sort_keys = False
 
 # ==================== FLASK ROUTES ====================
 
@@ -1232,57 +1452,81 @@ def static_files(filename):
     except Exception as e:
         return f"Error loading file: {e}", 404
 
+MAIN_MENU_ROWS = [
+    [KeyboardButton("✍️ Share")],
+    [KeyboardButton("👤 Profile"), KeyboardButton("📚 Posts")],
+    [KeyboardButton("🏆 Top"), KeyboardButton("⚙️ Settings")]
+]
+
+# Inline keyboard with just the "📱 Main Menu" button
+MENU_ONLY_KB = InlineKeyboardMarkup([[InlineKeyboardButton("📱 Main Menu", callback_data='menu')]])
+
+# Static help/about copy: the inline Help button shows the Amharic text, the ❓ Help menu key the English one
+HELP_TEXT_AM = (
+    "ℹ️ *የዚህ ቦት አጠቃቀም:*\n"
+    "•  menu button በመጠቀም የተለያዩ አማራጮችን ማየት ይችላሉ.\n"
+    "• 'Share My Thoughts' የሚለውን በመንካት በፈለጉት ነገር ጥያቄም ሆነ ሃሳብ መጻፍ ይችላሉ.\n"
+    "•  category ወይም መደብ በመምረጥ በ ጽሁፍ፣ ፎቶ እና ድምጽ ሃሳቦን ማንሳት ይችላሉ.\n"
+    "• እርስዎ ባነሱት ሃሳብ ላይ ሌሎች ሰዎች አስተያየት መጻፍ ይችላሉ\n"
+    "• View your profile የሚለውን በመንካት ስም፣ ጾታዎን መቀየር እንዲሁም እርስዎን የሚከተሉ ሰዎች ብዛት ማየት ይችላሉ.\n"
+    "• በተነሱ ጥያቄዎች ላይ ከቻናሉ comments የሚለድን በመጫን አስተያየትዎን መጻፍ ይችላሉ."
+)
+
+ABOUT_TEXT = (
+    "👤 Creator: Yididiya Tamiru\n\n"
+    "🔗 Telegram: @YIDIDIYATAMIRUU\n"
+    "🙏 This bot helps you share your thoughts anonymously with the Christian community."
+)
+
+HELP_TEXT = (
+    "ℹ️ *How to Use This Bot:*\n"
+    "• Use the menu buttons to navigate.\n"
+    "• Tap 'Share My Thoughts' to share your thoughts anonymously.\n"
+    "• Choose a category and type or send your message (text, photo, or voice).\n"
+    "• After posting, others can comment on your posts.\n"
+    "• View your profile, set your name and sex anytime.\n"
+    "• Use 'My Previous Posts' to view and continue your past posts.\n"
+    "• Use the comments button on channel posts to join the conversation here.\n"
+    "• Follow users to send them private messages."
+)
+
 # Helper to get dynamic main menu with token
 def get_main_menu(user_id: str):
     """Generate the main menu keyboard with a dynamic user token for the Web App"""
     try:
-        # Generate a secure JWT token (valid for 30 days)
-        token = jwt.encode(
-            {
-                'user_id': str(user_id),
-                'exp': datetime.now(timezone.utc) + timedelta(days=30)
-            },
-            TOKEN,
-            algorithm='HS256'
-        )
-        
-        render_url = os.getenv('RENDER_URL', 'https://your-render-url.onrender.com')
-        mini_app_url = f"{render_url}/?token={token}"
-        
-        return ReplyKeyboardMarkup(
-            keyboard=[
-                [KeyboardButton("✍️ Share")],
-                [KeyboardButton("👤 Profile"), KeyboardButton("📚 Posts")],
-                [KeyboardButton("🏆 Top"), KeyboardButton("⚙️ Settings")],
-                [KeyboardButton("🌐 Open App", web_app=WebAppInfo(url=mini_app_url))]
-            ],
-            resize_keyboard=True,
-            one_time_keyboard=False,
-            is_persistent=True,
-            input_field_placeholder="Choose option"
-        )
+        return build_main_menu(str(user_id), datetime.now(timezone.utc).date())
     except Exception as e:
         logger.error(f"Error generating dynamic menu: {e}")
         # Fallback to menu without Web App button if something fails
-        return ReplyKeyboardMarkup(
-            keyboard=[
-                [KeyboardButton("✍️ Share")],
-                [KeyboardButton("👤 Profile"), KeyboardButton("📚 Posts")],
-                [KeyboardButton("🏆 Top"), KeyboardButton("⚙️ Settings")]
-            ],
-            resize_keyboard=True,
-            one_time_keyboard=False,
-            is_persistent=True,
-            input_field_placeholder="Choose option"
-        )
+        return main_menu
+
+@lru_cache(maxsize=1024)
+def build_main_menu(user_id, issued_on):
+    """Main menu for one user; the token is 30 days valid, so one markup per user per day is enough"""
+    # Generate a secure JWT token (valid for 30 days)
+    token = jwt.encode(
+        {
+            'user_id': user_id,
+            'exp': datetime.now(timezone.utc) + timedelta(days=30)
+        },
+        TOKEN,
+        algorithm='HS256'
+    )
+    
+    render_url = os.getenv('RENDER_URL', 'https://your-render-url.onrender.com')
+    mini_app_url = f"{render_url}/?token={token}"
+    
+    return ReplyKeyboardMarkup(
+        keyboard=MAIN_MENU_ROWS + [[KeyboardButton("🌐 Open App", web_app=WebAppInfo(url=mini_app_url))]],
+        resize_keyboard=True,
+        one_time_keyboard=False,
+        is_persistent=True,
+        input_field_placeholder="Choose option"
+    )
 
 # Fallback for static contexts if needed (can be removed later)
 main_menu = ReplyKeyboardMarkup(
-    keyboard=[
-        [KeyboardButton("✍️ Share")],
-        [KeyboardButton("👤 Profile"), KeyboardButton("📚 Posts")],
-        [KeyboardButton("🏆 Top"), KeyboardButton("⚙️ Settings")]
-    ],
+    keyboard=MAIN_MENU_ROWS,
     resize_keyboard=True,
     one_time_keyboard=False,
     is_persistent=True,
@@ -1305,58 +1549,101 @@ def create_anonymous_name(user_id):
     # Simply return "Anonymous" without numbers for all new users
     return "Anonymous"
 
-@lru_cache(maxsize=1024)
+# Aura weight per reaction type (unknown types count as +1)
+REACTION_WEIGHTS = {
+    'like': 1,
+    'dislike': -2,
+    '🙏': 2,
+    '❤️': 2,
+    '🔥': 2,
+    '😢': 1,
+    '😡': -2,
+    '👎': -2
+}
+
 def calculate_user_rating(user_id):
+    """Aura points of one user, through calculate_user_ratings' grouped query and TTL cache."""
     # Weighted Scoring Logic:
-    # Approved Posts: +10 | Comments: +2 | Likes: +1 | Dislikes: -2 | Blocks: -10
-    
-    # 1. Post Points (+10 per approved post)
-    post_res = db_fetch_one("SELECT COUNT(*) as count FROM posts WHERE author_id = %s AND approved = TRUE", (user_id,))
-    post_points = (post_res['count'] if post_res else 0) * 10
-    
-    # 2. Comment Points (+2 per comment)
-    comm_res = db_fetch_one("SELECT COUNT(*) as count FROM comments WHERE author_id = %s", (user_id,))
-    comm_points = (comm_res['count'] if comm_res else 0) * 2
-    
-    # 3. Reactions Points (Dynamic Weights on both Comments and Posts)
-    comment_rx = db_fetch_all("""
-        SELECT r.type, COUNT(*) as count
-        FROM reactions r
-        JOIN comments c ON r.comment_id = c.comment_id
-        WHERE c.author_id = %s AND r.comment_id IS NOT NULL
-        GROUP BY r.type
-    """, (user_id,))
-    
-    post_rx = db_fetch_all("""
-        SELECT r.type, COUNT(*) as count
-        FROM reactions r
-        JOIN posts p ON r.post_id = p.post_id
-        WHERE p.author_id = %s AND r.post_id IS NOT NULL
-        GROUP BY r.type
-    """, (user_id,))
-    
-    weights = {
-        'like': 1,
-        'dislike': -2,
-        '🙏': 2,
-        '❤️': 2,
-        '🔥': 2,
-        '😢': 1,
-        '😡': -2,
-        '👎': -2
-    }
-    
-    rx_points = 0
-    for row in (comment_rx or []) + (post_rx or []):
-        r_type = row['type']
-        r_count = row['count']
-        rx_points += r_count * weights.get(r_type, 1)
-    
-    # 4. Block Points (-10 per block received)
-    block_res = db_fetch_one("SELECT COUNT(*) as count FROM blocks WHERE blocked_id = %s", (user_id,))
-    block_points = (block_res['count'] if block_res else 0) * -10
-    
-    return post_points + comm_points + rx_points + block_points
+    # Approved Posts: +10 | Comments: +2 | Reactions: REACTION_WEIGHTS | Blocks: -10
+    return calculate_user_ratings([user_id]).get(str(user_id), 0)
+
+# user_id -> (expires_at, rating) shared across renders and calculate_user_rating
+user_ratings_cache = {}
+user_ratings_cache_lock = threading.Lock()
+USER_RATINGS_TTL = 30
+
+def clear_rating_caches():
+    """Invalidate every cached aura value after posts, comments or reactions change."""
+    format_aura.cache_clear()
+    with user_ratings_cache_lock:
+        user_ratings_cache.clear()
+
+def forget_user_rating(user_id):
+    """Invalidate one user's cached aura, e.g. after a reaction on their comment."""
+    with user_ratings_cache_lock:
+        user_ratings_cache.pop(str(user_id), None)
+
+def calculate_user_ratings(user_ids):
+    """Compute aura points for many users in one grouped query, keyed by user_id."""
+    # Same weighting as calculate_user_rating, but one round-trip per rendered page,
+    # and only for authors not already cached by a recent render
+    wanted = {str(uid) for uid in user_ids if uid}
+    if not wanted:
+        return {}
+    now = time.monotonic()
+    cached = {}
+    with user_ratings_cache_lock:
+        for uid in wanted:
+            entry = user_ratings_cache.get(uid)
+            if entry and entry[0] > now:
+                cached[uid] = entry[1]
+    ids = tuple(wanted - cached.keys())
+    if not ids:
+        return cached
+    rows = db_fetch_all("""
+        SELECT author_id AS user_id, 'post' AS source, NULL::text AS type, COUNT(*) AS count
+        FROM posts WHERE approved = TRUE AND author_id IN %s
+        GROUP BY author_id
+        UNION ALL
+        SELECT author_id, 'comment', NULL::text, COUNT(*)
+        FROM comments WHERE author_id IN %s
+        GROUP BY author_id
+        UNION ALL
+        SELECT c.author_id, 'reaction', r.type, COUNT(*)
+        FROM reactions r JOIN comments c ON r.comment_id = c.comment_id
+        WHERE c.author_id IN %s AND r.comment_id IS NOT NULL
+        GROUP BY c.author_id, r.type
+        UNION ALL
+        SELECT p.author_id, 'reaction', r.type, COUNT(*)
+        FROM reactions r JOIN posts p ON r.post_id = p.post_id
+        WHERE p.author_id IN %s AND r.post_id IS NOT NULL
+        GROUP BY p.author_id, r.type
+        UNION ALL
+        SELECT blocked_id, 'block', NULL::text, COUNT(*)
+        FROM blocks WHERE blocked_id IN %s
+        GROUP BY blocked_id
+    """, (ids, ids, ids, ids, ids))
+
+    ratings = dict.fromkeys(ids, 0)
+    for row in rows or []:
+        source = row['source']
+        if source == 'post':
+            points = row['count'] * 10
+        elif source == 'comment':
+            points = row['count'] * 2
+        elif source == 'reaction':
+            points = row['count'] * REACTION_WEIGHTS.get(row['type'], 1)
+        else:
+            points = row['count'] * -10
+        ratings[row['user_id']] += points
+
+    with user_ratings_cache_lock:
+        if len(user_ratings_cache) > 4096:
+            user_ratings_cache.clear()
+        for uid, rating in ratings.items():
+            user_ratings_cache[uid] = (now + USER_RATINGS_TTL, rating)
+    ratings.update(cached)
+    return ratings
 
 def calculate_top_weekly_contributors():
     """Calculate top 3 users by aura points earned in the last 7 days."""
@@ -1423,6 +1710,7 @@ async def award_weekly_badges(context: ContextTypes.DEFAULT_TYPE):
         
         # Clear previous badges
         db_execute("UPDATE users SET weekly_badge = NULL")
+        invalidate_user()
         
         top_users = calculate_top_weekly_contributors()
         if not top_users:
@@ -1434,6 +1722,8 @@ async def award_weekly_badges(context: ContextTypes.DEFAULT_TYPE):
         winners_info = []
         today = datetime.now(timezone.utc).date()
         
+        winner_rows = get_users_by_ids(u['user_id'] for u in top_users)
+        
         for idx, user_data in enumerate(top_users):
             user_id = user_data['user_id']
             points = user_data['weekly_points']
@@ -1449,10 +1739,10 @@ async def award_weekly_badges(context: ContextTypes.DEFAULT_TYPE):
             """, (user_id, today, rank, points, badge_emoji))
             
             # Update current badge in users table
-            db_execute("UPDATE users SET weekly_badge = %s WHERE user_id = %s", (badge_emoji, user_id))
+            update_user(user_id, weekly_badge=badge_emoji)
             
             # Get user info for announcement
-            user = db_fetch_one("SELECT anonymous_name FROM users WHERE user_id = %s", (user_id,))
+            user = winner_rows.get(user_id)
             name = user['anonymous_name'] if user else "Contributor"
             winners_info.append(f"{badge_emoji} {name} – {points} pts")
             
@@ -1513,15 +1803,277 @@ def format_aura(rating):
     else:
         return "⚪️"  # White aura for new/neutral users (0-9 points)
 
+def count_comment_replies(comment_ids):
+    """Number of replies (at any depth) under each of the given comments, in one recursive query."""
+    ids = tuple(set(comment_ids))
+    if not ids:
+        return {}
+    rows = db_fetch_all("""
+        WITH RECURSIVE tree AS (
+            SELECT comment_id, parent_comment_id AS root_id FROM comments WHERE parent_comment_id IN %s
+            UNION ALL
+            SELECT c.comment_id, t.root_id FROM comments c
+            JOIN tree t ON c.parent_comment_id = t.comment_id
+        )
+        SELECT root_id, COUNT(*) AS cnt FROM tree GROUP BY root_id
+    """, (ids,))
+    return {row['root_id']: row['cnt'] for row in rows}
+
+def save_comment(post_id, parent_comment_id, author_id, content, comment_type, file_id):
+    """Insert a comment, clear the author's comment state and bump the post count in one transaction.
+
+    Returns the post's channel_message_id and new comment_count.
+    """
+    # All three writes go in one statement, so one round trip per comment
+    with db_transaction() as cur:
+        cur.execute(
+            """WITH new_comment AS (
+                INSERT INTO comments
+                (post_id, parent_comment_id, author_id, content, type, file_id)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ), cleared AS (
+                UPDATE users SET waiting_for_comment = FALSE, comment_post_id = NULL, comment_idx = NULL
+                WHERE user_id = %s
+            )
+            UPDATE posts SET comment_count = COALESCE(comment_count, 0) + 1
+            WHERE post_id = %s RETURNING channel_message_id, comment_count""",
+            (post_id, parent_comment_id, author_id, content, comment_type, file_id, author_id, post_id)
+        )
+        return cur.fetchone()
+
+# comment_id -> [likes, dislikes], adjusted in place on each toggle.
+# A count only fills the cache if no toggle or forget overlapped it (same epoch, none
+# pending), so an entry never already includes a delta that is still to be applied.
+comment_reaction_counts = OrderedDict()
+comment_reaction_counts_lock = threading.Lock()
+comment_reaction_toggles_pending = {}
+comment_reaction_counts_epoch = 0
+COMMENT_REACTION_COUNTS_MAX = 4096
+COMMENT_REACTION_COUNTS_SQL = """
+    SELECT
+        COUNT(*) FILTER (WHERE type NOT IN ('dislike', '👎', '😡')) AS likes,
+        COUNT(*) FILTER (WHERE type IN ('dislike', '👎', '😡')) AS dislikes
+    FROM reactions WHERE comment_id = %s
+"""
+
+# Reaction toggles are frequent and cheap to lose, so their commits don't wait for the
+# WAL flush (Postgres' counterpart to SQLite's synchronous=NORMAL). Scoped to the transaction.
+FAST_COMMIT_SQL = "SET LOCAL synchronous_commit = off"
+
+def forget_comment_reaction_counts(comment_id):
+    """Drop cached like/dislike counts after reactions change outside toggle_comment_reaction."""
+    global comment_reaction_counts_epoch
+    with comment_reaction_counts_lock:
+        comment_reaction_counts.pop(int(comment_id), None)
+        comment_reaction_counts_epoch += 1
+
+def get_comment_reaction_counts(comment_id):
+    """Like/dislike counts for a comment, counted after any commit and cached when no toggle overlapped."""
+    with comment_reaction_counts_lock:
+        counts = comment_reaction_counts.get(comment_id)
+        if counts is not None:
+            comment_reaction_counts.move_to_end(comment_id)
+            return counts[0], counts[1]
+        epoch = comment_reaction_counts_epoch
+    row = db_fetch_one(COMMENT_REACTION_COUNTS_SQL, (comment_id,))
+    with comment_reaction_counts_lock:
+        if epoch == comment_reaction_counts_epoch and comment_id not in comment_reaction_toggles_pending:
+            comment_reaction_counts[comment_id] = [row['likes'], row['dislikes']]
+            if len(comment_reaction_counts) > COMMENT_REACTION_COUNTS_MAX:
+                comment_reaction_counts.popitem(last=False)
+    return row['likes'], row['dislikes']
+
+def delete_comment(comment_id):
+    """Lift a comment's replies to top level, then delete it and its reactions in one transaction.
+
+    Returns the comment's post_id, or None if it was already gone.
+    """
+    with db_transaction() as cur:
+        cur.execute("UPDATE comments SET parent_comment_id = 0 WHERE parent_comment_id = %s", (comment_id,))
+        cur.execute("DELETE FROM reactions WHERE comment_id = %s", (comment_id,))
+        cur.execute("DELETE FROM comments WHERE comment_id = %s RETURNING post_id", (comment_id,))
+        row = cur.fetchone()
+    forget_comment_reaction_counts(comment_id)
+    return row['post_id'] if row else None
+
+# Advisory lock key serializing vent number assignment across approvals
+VENT_NUMBER_LOCK_ID = 7301
+
+def claim_vent_number(post_id):
+    """Reserve the next vent number for an unapproved post (keeping one it already holds).
+
+    Returns None if the post is gone or already approved.
+    """
+    with db_transaction() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (VENT_NUMBER_LOCK_ID,))
+        cur.execute(
+            """UPDATE posts SET vent_number = COALESCE(
+                vent_number, (SELECT COALESCE(MAX(vent_number), 0) + 1 FROM posts)
+            )
+            WHERE post_id = %s AND NOT COALESCE(approved, FALSE)
+            RETURNING vent_number""",
+            (post_id,)
+        )
+        row = cur.fetchone()
+    return row['vent_number'] if row else None
+
+def release_vent_number(post_id):
+    """Give back a reserved vent number when publishing fails."""
+    db_execute(
+        "UPDATE posts SET vent_number = NULL WHERE post_id = %s AND NOT COALESCE(approved, FALSE)",
+        (post_id,)
+    )
+
+def save_post(content, author_id, media_type, media_id, thread_from_post_id, category_codes):
+    """Insert a pending post and its categories in one transaction. Returns the new post_id."""
+    with db_transaction() as cur:
+        cur.execute(
+            """INSERT INTO posts (content, author_id, media_type, media_id, thread_from_post_id)
+            VALUES (%s, %s, %s, %s, %s) RETURNING post_id""",
+            (content, author_id, media_type, media_id, thread_from_post_id)
+        )
+        post_id = cur.fetchone()['post_id']
+        if category_codes:
+            cur.execute(
+                """INSERT INTO post_categories (post_id, category_code)
+                SELECT %s, unnest(%s::text[]) ON CONFLICT DO NOTHING""",
+                (post_id, category_codes)
+            )
+        return post_id
+
+def save_private_message(sender_id, receiver_id, content):
+    """Insert a private message and clear the sender's reply state in one transaction.
+
+    Returns the new message row (message_id).
+    """
+    with db_transaction() as cur:
+        cur.execute(
+            "INSERT INTO private_messages (sender_id, receiver_id, content) VALUES (%s, %s, %s) RETURNING message_id",
+            (sender_id, receiver_id, content)
+        )
+        message_row = cur.fetchone()
+        cur.execute(
+            "UPDATE users SET waiting_for_private_message = FALSE, private_message_target = NULL WHERE user_id = %s",
+            (sender_id,)
+        )
+    invalidate_user(sender_id)
+    return message_row
+
+def toggle_comment_reaction(comment_id, user_id, reaction_type):
+    """Toggle a like/dislike on a comment in one transaction.
 
-def count_all_comments(post_id):
-    """Get the total number of comments for a post using a single query."""
+    Clicking the same group removes the reaction, otherwise it is upserted.
+    Returns the new like/dislike counts and the user's current reaction type.
+    """
+    global comment_reaction_counts_epoch
+    is_dislike = reaction_type == 'dislike'
+    # Mark the toggle in flight so no concurrent count can cache a total that already includes it
+    with comment_reaction_counts_lock:
+        comment_reaction_toggles_pending[comment_id] = comment_reaction_toggles_pending.get(comment_id, 0) + 1
+        comment_reaction_counts_epoch += 1
+    result = None
     try:
-        row = db_fetch_one("SELECT COUNT(*) as cnt FROM comments WHERE post_id = %s", (post_id,))
-        return row['cnt'] if row else 0
-    except Exception as e:
-        logger.error(f"Error in count_all_comments: {e}")
-        return 0
+        result = _toggle_comment_reaction(comment_id, user_id, is_dislike, reaction_type)
+    finally:
+        with comment_reaction_counts_lock:
+            if result is not None:
+                user_reaction, delta = result
+                # Entries were filled before this toggle began, so the delta is not yet in them
+                cached = comment_reaction_counts.get(comment_id)
+                if cached is not None:
+                    cached[0] += delta[0]
+                    cached[1] += delta[1]
+            left = comment_reaction_toggles_pending[comment_id] - 1
+            if left:
+                comment_reaction_toggles_pending[comment_id] = left
+            else:
+                del comment_reaction_toggles_pending[comment_id]
+            comment_reaction_counts_epoch += 1
+    likes, dislikes = get_comment_reaction_counts(comment_id)
+    return {'likes': likes, 'dislikes': dislikes, 'user_reaction': user_reaction}
+
+def _toggle_comment_reaction(comment_id, user_id, is_dislike, reaction_type):
+    """The toggle transaction; returns the user's reaction and the (likes, dislikes) delta."""
+    with db_transaction() as cur:
+        cur.execute(FAST_COMMIT_SQL)
+        cur.execute(
+            """DELETE FROM reactions
+            WHERE comment_id = %s AND user_id = %s AND (type IN ('dislike', '👎', '😡')) = %s
+            RETURNING reaction_id""",
+            (comment_id, user_id, is_dislike)
+        )
+        if cur.fetchone():
+            user_reaction = None
+            delta = (0, -1) if is_dislike else (-1, 0)
+        else:
+            # A surviving row can only be from the other group, so xmax tells insert vs switch
+            cur.execute(
+                """INSERT INTO reactions (comment_id, user_id, type) VALUES (%s, %s, %s)
+                ON CONFLICT (comment_id, user_id) WHERE comment_id IS NOT NULL
+                DO UPDATE SET type = EXCLUDED.type
+                RETURNING (xmax = 0) AS inserted""",
+                (comment_id, user_id, reaction_type)
+            )
+            inserted = cur.fetchone()['inserted']
+            user_reaction = reaction_type
+            if is_dislike:
+                delta = (0, 1) if inserted else (-1, 1)
+            else:
+                delta = (1, 0) if inserted else (1, -1)
+    return user_reaction, delta
+
+def get_emoji_reactions(target_column, target_ids, user_id=None):
+    """Per-type reaction counts and the user's own reaction for many posts or comments.
+
+    One grouped query; returns ({id: {type: count}}, {id: user's type}).
+    """
+    assert target_column in ('post_id', 'comment_id')
+    ids = tuple(set(target_ids))
+    if not ids:
+        return {}, {}
+    rows = db_fetch_all(
+        f"""SELECT {target_column} AS target_id, type, COUNT(*) AS cnt, BOOL_OR(user_id = %s) AS mine
+        FROM reactions WHERE {target_column} IN %s
+        GROUP BY {target_column}, type""",
+        (str(user_id) if user_id else None, ids)
+    )
+    counts, mine = {}, {}
+    for row in rows:
+        counts.setdefault(row['target_id'], {})[row['type']] = row['cnt']
+        if row['mine']:
+            mine[row['target_id']] = row['type']
+    return counts, mine
+
+def toggle_reaction(target_column, target_id, user_id, reaction_type):
+    """Toggle an emoji reaction on a post or comment in one transaction.
+
+    target_column is 'post_id' or 'comment_id'. Returns (action, counts by type, user's reaction).
+    """
+    assert target_column in ('post_id', 'comment_id')
+    with db_transaction() as cur:
+        cur.execute(FAST_COMMIT_SQL)
+        cur.execute(
+            f"DELETE FROM reactions WHERE {target_column} = %s AND user_id = %s AND type = %s RETURNING reaction_id",
+            (target_id, user_id, reaction_type)
+        )
+        if cur.fetchone():
+            action, user_reaction = 'removed', None
+        else:
+            cur.execute(
+                f"""INSERT INTO reactions ({target_column}, user_id, type) VALUES (%s, %s, %s)
+                ON CONFLICT ({target_column}, user_id) WHERE {target_column} IS NOT NULL
+                DO UPDATE SET type = EXCLUDED.type
+                RETURNING (xmax = 0) AS inserted""",
+                (target_id, user_id, reaction_type)
+            )
+            action = 'added' if cur.fetchone()['inserted'] else 'updated'
+            user_reaction = reaction_type
+        cur.execute(
+            f"SELECT type, COUNT(*) as cnt FROM reactions WHERE {target_column} = %s GROUP BY type",
+            (target_id,)
+        )
+        counts = {row['type']: row['cnt'] for row in cur.fetchall()}
+    return action, counts, user_reaction
 def get_cancel_reply_keyboard():
     """Create cancel button for reply keyboard (text) - ONLY for input states"""
     return ReplyKeyboardMarkup(
@@ -1550,62 +2102,165 @@ def get_display_sex(user_data):
             return user_data['sex']
     return ""
 
-def get_user_rank(user_id):
-    users = db_fetch_all('''
-        SELECT user_id, 
-               (
-                (SELECT COUNT(*) FROM posts p WHERE p.author_id = u.user_id AND p.approved = TRUE) * 10 +
-                (SELECT COUNT(*) FROM comments c WHERE c.author_id = u.user_id) * 2 +
-                COALESCE((
-                    SELECT SUM(CASE WHEN r.type = 'like' THEN 1 WHEN r.type = 'dislike' THEN -2 ELSE 0 END)
-                    FROM reactions r
-                    JOIN comments c2 ON r.comment_id = c2.comment_id
-                    WHERE c2.author_id = u.user_id
-                ), 0) -
-                (SELECT COUNT(*) FROM blocks b WHERE b.blocked_id = u.user_id) * 10
-               ) as total
-        FROM users u
-        WHERE u.is_admin = FALSE
-        ORDER BY total DESC
+# Leaderboard points of the users row aliased u
+LEADERBOARD_SCORE_SQL = """(
+    (SELECT COUNT(*) FROM posts p WHERE p.author_id = u.user_id AND p.approved = TRUE) * 10 +
+    (SELECT COUNT(*) FROM comments c WHERE c.author_id = u.user_id) * 2 +
+    COALESCE((
+        SELECT SUM(CASE WHEN r.type = 'like' THEN 1 WHEN r.type = 'dislike' THEN -2 ELSE 0 END)
+        FROM reactions r
+        JOIN comments c2 ON r.comment_id = c2.comment_id
+        WHERE c2.author_id = u.user_id
+    ), 0) -
+    (SELECT COUNT(*) FROM blocks b WHERE b.blocked_id = u.user_id) * 10
+)"""
+
+# (expires_at, ranked rows, rows by user_id); the board is the same for everyone, so it is
+# scored at most once per LEADERBOARD_TTL seconds instead of on every view
+leaderboard_cache = None
+leaderboard_cache_lock = threading.Lock()
+LEADERBOARD_TTL = 30
+
+def get_leaderboard_ranking():
+    """Every non-admin user with points and rank, best first, plus the same rows keyed by user_id"""
+    global leaderboard_cache
+    now = time.monotonic()
+    with leaderboard_cache_lock:
+        if leaderboard_cache and leaderboard_cache[0] > now:
+            return leaderboard_cache[1], leaderboard_cache[2]
+    rows = db_fetch_all(f'''
+        SELECT scored.*, ROW_NUMBER() OVER (ORDER BY total DESC) AS rank
+        FROM (
+            SELECT u.user_id, u.anonymous_name, u.sex, u.avatar_emoji, u.weekly_badge,
+                   {LEADERBOARD_SCORE_SQL} AS total
+            FROM users u
+            WHERE u.is_admin = FALSE
+        ) scored
+        ORDER BY rank
     ''')
-
-    
-    for rank, user in enumerate(users, start=1):
-        if user['user_id'] == user_id:
-            return rank
-    return None
+    by_user = {row['user_id']: row for row in rows}
+    with leaderboard_cache_lock:
+        leaderboard_cache = (now + LEADERBOARD_TTL, rows, by_user)
+    return rows, by_user
+
+def get_leaderboard(viewer_id, limit=10):
+    """Top non-admin users by points plus the viewer's own row if it ranks lower"""
+    rows, by_user = get_leaderboard_ranking()
+    viewer = by_user.get(viewer_id)
+    if viewer and viewer['rank'] > limit:
+        return rows[:limit] + [viewer]
+    return rows[:limit]
 
 async def update_channel_post_comment_count(context: ContextTypes.DEFAULT_TYPE, post_id: int):
     """Update the comment count on the channel post"""
     try:
-        # Get the post details
-        post = db_fetch_one("SELECT channel_message_id, comment_count FROM posts WHERE post_id = %s", (post_id,))
-        if not post or not post['channel_message_id']:
+        # Recount, store and fetch the channel message in a single round-trip
+        post = await db_fetch_one_async("""
+            UPDATE posts
+            SET comment_count = (SELECT COUNT(*) FROM comments WHERE post_id = %s)
+            WHERE post_id = %s AND channel_message_id IS NOT NULL
+            RETURNING channel_message_id, comment_count
+        """, (post_id, post_id))
+        if not post:
             return
-        
-        # Count all comments for this post
-        total_comments = count_all_comments(post_id)
-        
-        # Update the database with the new count
-        db_execute("UPDATE posts SET comment_count = %s WHERE post_id = %s", (total_comments, post_id))
-        
-        # Update the channel message button
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton(f"💬 Add/view Comments ({total_comments})", url=f"https://t.me/{BOT_USERNAME}?start=comments_{post_id}")]
-        ])
-        
+        await edit_channel_comment_button(context, post_id, post['channel_message_id'], post['comment_count'])
+    except Exception as e:
+        logger.error(f"Error updating channel post comment count: {e}")
+
+# post_id -> the one refresh task for that post; bursts on one post share a single edit,
+# and edits of one post never overlap, so they land in order
+pending_count_refresh = {}
+posts_refresh_requested = set()
+posts_needing_recount = set()
+COMMENT_COUNT_DEBOUNCE = 0.5
+
+def schedule_comment_count_refresh(context: ContextTypes.DEFAULT_TYPE, post_id: int, recount: bool = False):
+    """Refresh a post's channel comment button in the background, coalescing bursts.
+
+    recount resyncs posts.comment_count from the comments table first (after deletions).
+    """
+    if recount:
+        posts_needing_recount.add(post_id)
+    if post_id in pending_count_refresh:
+        posts_refresh_requested.add(post_id)
+    else:
+        pending_count_refresh[post_id] = asyncio.create_task(flush_comment_count_refresh(context, post_id))
+
+async def flush_comment_count_refresh(context: ContextTypes.DEFAULT_TYPE, post_id: int):
+    """Wait out the debounce window, then edit the channel button with the latest count.
+
+    Requests arriving while an edit is in flight run one more round afterwards.
+    """
+    try:
+        while True:
+            await asyncio.sleep(COMMENT_COUNT_DEBOUNCE)
+            posts_refresh_requested.discard(post_id)
+            await refresh_channel_comment_button(context, post_id)
+            if post_id not in posts_refresh_requested:
+                break
+    finally:
+        pending_count_refresh.pop(post_id, None)
+
+async def refresh_channel_comment_button(context: ContextTypes.DEFAULT_TYPE, post_id: int):
+    """One button refresh: recount if requested, else read the stored count"""
+    if post_id in posts_needing_recount:
+        posts_needing_recount.discard(post_id)
+        await update_channel_post_comment_count(context, post_id)
+        return
+    try:
+        post = await db_fetch_one_async(
+            "SELECT channel_message_id, comment_count FROM posts WHERE post_id = %s",
+            (post_id,)
+        )
+    except Exception as e:
+        logger.error(f"Error reading comment count for post {post_id}: {e}")
+        return
+    if post and post['channel_message_id']:
+        await edit_channel_comment_button(context, post_id, post['channel_message_id'], post['comment_count'] or 0)
+
+# Set by post_init so Flask routes can hand button refreshes to the bot's event loop
+bot_application = None
+bot_loop = None
+
+def schedule_comment_count_refresh_threadsafe(post_id):
+    """schedule_comment_count_refresh for the Flask thread (mini app writes)"""
+    if bot_loop is None:
+        return  # Bot not started yet; the next refresh picks up the stored count
+    bot_loop.call_soon_threadsafe(schedule_comment_count_refresh, bot_application, post_id)
+
+# post_id -> comment count the channel button is known to show (recorded after a
+# successful edit), so repeat counts skip the edit. Only touched on the event loop.
+channel_button_counts = OrderedDict()
+CHANNEL_BUTTON_COUNTS_MAX = 4096
+
+def record_channel_button_count(post_id, total_comments):
+    """Remember the count a successful edit put on the button."""
+    channel_button_counts[post_id] = total_comments
+    channel_button_counts.move_to_end(post_id)
+    if len(channel_button_counts) > CHANNEL_BUTTON_COUNTS_MAX:
+        channel_button_counts.popitem(last=False)
+
+async def edit_channel_comment_button(context: ContextTypes.DEFAULT_TYPE, post_id: int, channel_message_id: int, total_comments: int):
+    """Set the channel post's comment button to an already known count"""
+    if channel_button_counts.get(post_id) == total_comments:
+        return
+    try:
         # Try to edit the message in the channel
+        await throttle_send()
         await context.bot.edit_message_reply_markup(
             chat_id=CHANNEL_ID,
-            message_id=post['channel_message_id'],
-            reply_markup=keyboard
+            message_id=channel_message_id,
+            reply_markup=comments_kb(post_id, total_comments)
         )
+        record_channel_button_count(post_id, total_comments)
     except BadRequest as e:
-        if "message is not modified" not in str(e).lower():
+        if "message is not modified" in str(e).lower():
+            record_channel_button_count(post_id, total_comments)
+        else:
+            channel_button_counts.pop(post_id, None)
             logger.error(f"Failed to update comment count in channel: {e}")
-
-
     except Exception as e:
+        channel_button_counts.pop(post_id, None)
         logger.error(f"Error updating channel post comment count: {e}")
 
 async def show_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1628,25 +2283,11 @@ async def show_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if loading_msg:
         await animated_loading(loading_msg, "Loading leaderboard", 3)
     
-    # Get top 10 users with weighted aura
-    top_users = db_fetch_all('''
-        SELECT u.user_id, u.anonymous_name, u.sex, u.avatar_emoji, u.weekly_badge,
-               (
-                (SELECT COUNT(*) FROM posts p WHERE p.author_id = u.user_id AND p.approved = TRUE) * 10 +
-                (SELECT COUNT(*) FROM comments c WHERE c.author_id = u.user_id) * 2 +
-                COALESCE((
-                    SELECT SUM(CASE WHEN r.type = 'like' THEN 1 WHEN r.type = 'dislike' THEN -2 ELSE 0 END)
-                    FROM reactions r
-                    JOIN comments c2 ON r.comment_id = c2.comment_id
-                    WHERE c2.author_id = u.user_id
-                ), 0) -
-                (SELECT COUNT(*) FROM blocks b WHERE b.blocked_id = u.user_id) * 10
-               ) as total
-        FROM users u
-        WHERE u.is_admin = FALSE
-        ORDER BY total DESC
-        LIMIT 10
-    ''')
+    # Top 10 users with weighted aura and the viewer's rank, scored in a single pass
+    user_id = str(update.effective_user.id)
+    ranked = get_leaderboard(user_id)
+    top_users = [row for row in ranked if row['rank'] <= 10]
+    user_rank = next((row['rank'] for row in ranked if row['user_id'] == user_id), None)
 
     
     # Create clean header
@@ -1661,12 +2302,12 @@ async def show_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if user.get('weekly_badge'):
             display_name = f"{user['weekly_badge']} {display_name}"
             
-        safe_name = escape_markdown(display_name, version=2)
+        safe_name = escape_markdown_v2(display_name)
         sex_val = user['sex'] if user['sex'] in ('👨', '👩') else ""
-        safe_sex = escape_markdown(sex_val, version=2)
-        safe_total = escape_markdown(str(user['total']), version=2)
-        safe_aura = escape_markdown(format_aura(user['total']), version=2)
-        profile_link = f"https://t.me/{BOT_USERNAME}?start=profileid_{user['user_id']}"
+        safe_sex = escape_markdown_v2(sex_val)
+        safe_total = escape_markdown_v2(str(user['total']))
+        safe_aura = escape_markdown_v2(format_aura(user['total']))
+        profile_link = f"{PROFILE_URL_PREFIX}{user['user_id']}"
         
         # Create clean line
         if idx <= 3:
@@ -1674,7 +2315,7 @@ async def show_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             rank_prefix = f"{idx}."
         
-        safe_rank = escape_markdown(rank_prefix, version=2)
+        safe_rank = escape_markdown_v2(rank_prefix)
 
         leaderboard_text += (
             f"{safe_rank}{' ' + safe_sex if safe_sex else ''} "
@@ -1685,20 +2326,17 @@ async def show_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     
     # Add current user's rank
-    user_id = str(update.effective_user.id)
-    user_rank = get_user_rank(user_id)
-    
     if user_rank:
-        user_data = db_fetch_one("SELECT anonymous_name, sex, is_admin FROM users WHERE user_id = %s", (user_id,))
+        user_data = get_user(user_id)
         if user_data:
             user_contributions = calculate_user_rating(user_id)
-            safe_user_name = escape_markdown(user_data['anonymous_name'], version=2)
+            safe_user_name = escape_markdown_v2(user_data['anonymous_name'])
             user_sex_val = user_data['sex'] if user_data['sex'] in ('👨', '👩') else ""
-            safe_user_sex = escape_markdown(user_sex_val, version=2)
+            safe_user_sex = escape_markdown_v2(user_sex_val)
             user_aura_val = "🔵" if user_data.get('is_admin') else format_aura(user_contributions)
-            safe_user_aura = escape_markdown(user_aura_val, version=2)
-            safe_user_pts = escape_markdown(str(user_contributions), version=2)
-            safe_user_rank = escape_markdown(str(user_rank), version=2)
+            safe_user_aura = escape_markdown_v2(user_aura_val)
+            safe_user_pts = escape_markdown_v2(str(user_contributions))
+            safe_user_rank = escape_markdown_v2(str(user_rank))
             
             leaderboard_text += f"*Your position:* {safe_user_rank}\n"
             leaderboard_text += f"{safe_user_sex}{' ' if safe_user_sex else ''}{safe_user_name} • {safe_user_pts} pts {safe_user_aura}\n\n"
@@ -1756,11 +2394,44 @@ async def show_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except:
                 pass
 
+@lru_cache(maxsize=8)
+def settings_keyboard(notifications_enabled, privacy_public, is_admin):
+    """Settings menu markup; only the two toggles and the admin row vary"""
+    notifications_status = "✅ ON" if notifications_enabled else "❌ OFF"
+    privacy_status = "🌍 Public" if privacy_public else "🔒 Private"
+    
+    keyboard = [
+        [
+            InlineKeyboardButton(f"🔔 Notifications: {notifications_status}", 
+                               callback_data='toggle_notifications')
+        ],
+        [
+            InlineKeyboardButton(f"👁‍🗨 Privacy: {privacy_status}", 
+                               callback_data='toggle_privacy')
+        ],
+        [
+            InlineKeyboardButton("👁️ Privacy Controls", callback_data='privacy_settings')
+        ],
+        [
+            InlineKeyboardButton("🚫 Blocked Users", callback_data='list_blocked')
+        ],
+        [
+            InlineKeyboardButton("📱 Main Menu", callback_data='menu'),
+            InlineKeyboardButton("👤 Profile", callback_data='profile')
+        ]
+    ]
+    
+    # Add admin panel button if user is admin
+    if is_admin:
+        keyboard.insert(0, [InlineKeyboardButton("🛠 Admin Panel", callback_data='admin_panel')])
+    
+    return InlineKeyboardMarkup(keyboard)
+
 async def show_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
     
     try:
-        user = db_fetch_one("SELECT notifications_enabled, privacy_public, is_admin FROM users WHERE user_id = %s", (user_id,))
+        user = get_user(user_id)
         
         if not user:
             if update.message:
@@ -1769,35 +2440,9 @@ async def show_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await update.callback_query.message.reply_text("Please use /start first to initialize your profile.")
             return
         
-        notifications_status = "✅ ON" if user['notifications_enabled'] else "❌ OFF"
-        privacy_status = "🌍 Public" if user['privacy_public'] else "🔒 Private"
-        
-        keyboard = [
-            [
-                InlineKeyboardButton(f"🔔 Notifications: {notifications_status}", 
-                                   callback_data='toggle_notifications')
-            ],
-            [
-                InlineKeyboardButton(f"👁‍🗨 Privacy: {privacy_status}", 
-                                   callback_data='toggle_privacy')
-            ],
-            [
-                InlineKeyboardButton("👁️ Privacy Controls", callback_data='privacy_settings')
-            ],
-            [
-                InlineKeyboardButton("🚫 Blocked Users", callback_data='list_blocked')
-            ],
-            [
-                InlineKeyboardButton("📱 Main Menu", callback_data='menu'),
-                InlineKeyboardButton("👤 Profile", callback_data='profile')
-            ]
-        ]
-        
-        # Add admin panel button if user is admin
-        if user['is_admin']:
-            keyboard.insert(0, [InlineKeyboardButton("🛠 Admin Panel", callback_data='admin_panel')])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = settings_keyboard(
+            bool(user['notifications_enabled']), bool(user['privacy_public']), bool(user['is_admin'])
+        )
         
         if update.callback_query:
             try:
@@ -1880,21 +2525,21 @@ async def send_post_confirmation(update: Update, context: ContextTypes.DEFAULT_T
     
     thread_text = ""
     if thread_from_post_id:
-        thread_post = db_fetch_one("SELECT content, channel_message_id FROM posts WHERE post_id = %s", (thread_from_post_id,))
+        thread_post = db_fetch_one("SELECT LEFT(content, 101) AS content, channel_message_id FROM posts WHERE post_id = %s", (thread_from_post_id,))
         if thread_post:
-            thread_preview = thread_post['content'][:100] + '...' if len(thread_post['content']) > 100 else thread_post['content']
+            thread_preview = clip_text(thread_post['content'], 100)
             if thread_post['channel_message_id']:
-                thread_text = f"🔄 *Thread continuation from your previous post:*\n{escape_markdown(thread_preview, version=2)}\n\n"
+                thread_text = f"🔄 *Thread continuation from your previous post:*\n{escape_markdown_v2(thread_preview)}\n\n"
             else:
-                thread_text = f"🔄 *Threading from previous post:*\n{escape_markdown(thread_preview, version=2)}\n\n"
+                thread_text = f"🔄 *Threading from previous post:*\n{escape_markdown_v2(thread_preview)}\n\n"
     
     # Format categories for preview
     category_list = category.split(',') if category else []
     cat_display = ", ".join(category_list)
     
     preview_text = (
-        f"{thread_text}📝 *Post Preview* [{escape_markdown(cat_display, 2)}]\n\n"
-        f"{escape_markdown(post_content, version=2)}\n\n"
+        f"{thread_text}📝 *Post Preview* [{escape_markdown_v2(cat_display)}]\n\n"
+        f"{escape_markdown_v2(post_content)}\n\n"
         f"Please confirm your post\\:"
     )
 
@@ -1955,7 +2600,7 @@ async def send_post_confirmation(update: Update, context: ContextTypes.DEFAULT_T
                 # Try to send as a new message instead
                 await update.callback_query.message.reply_text(
                     f"📝 *Post Preview* [{cat_display}]\n\n"
-                    f"{escape_markdown(post_content, version=2)}\n\n"
+                    f"{escape_markdown_v2(post_content)}\n\n"
                     f"Please confirm your post:",
                     reply_markup=InlineKeyboardMarkup(keyboard),
                     parse_mode=ParseMode.MARKDOWN_V2
@@ -1970,7 +2615,7 @@ async def send_post_confirmation(update: Update, context: ContextTypes.DEFAULT_T
 async def notify_vent_author_of_comment(context: ContextTypes.DEFAULT_TYPE, post_id: int, commenter_id: str):
     """Notify the post author when a new top‑level comment is added."""
     try:
-        post = db_fetch_one("SELECT author_id, content FROM posts WHERE post_id = %s", (post_id,))
+        post = get_post_meta(post_id)
         if not post:
             return
         
@@ -1985,7 +2630,7 @@ async def notify_vent_author_of_comment(context: ContextTypes.DEFAULT_TYPE, post
         commenter = db_fetch_one("SELECT anonymous_name FROM users WHERE user_id = %s", (commenter_id,))
         commenter_name = get_display_name(commenter)
         
-        post_preview = post['content'][:50] + '...' if len(post['content']) > 50 else post['content']
+        post_preview = clip_text(post['preview'], 50)
         
         # Use HTML parsing – no need to escape markdown special characters
         import html
@@ -1996,7 +2641,7 @@ async def notify_vent_author_of_comment(context: ContextTypes.DEFAULT_TYPE, post
             f"💬 <b>New comment on your vent!</b>\n\n"
             f"👤 {safe_commenter_name} commented:\n\n"
             f"📝 <b>Your vent:</b> {safe_post_preview}\n\n"
-            f"🔗 <a href='https://t.me/{BOT_USERNAME}?start=comments_{post_id}'>View conversation</a>"
+            f"🔗 <a href='{COMMENTS_URL_PREFIX}{post_id}'>View conversation</a>"
         )
         
         await context.bot.send_message(
@@ -2008,15 +2653,15 @@ async def notify_vent_author_of_comment(context: ContextTypes.DEFAULT_TYPE, post
         logger.error(f"Error notifying vent author: {e}")
 async def notify_user_of_reply(context: ContextTypes.DEFAULT_TYPE, post_id: int, comment_id: int, replier_id: str):
     try:
-        comment = db_fetch_one("SELECT * FROM comments WHERE comment_id = %s", (comment_id,))
+        comment = db_fetch_one("SELECT author_id, LEFT(content, 100) AS content_preview FROM comments WHERE comment_id = %s", (comment_id,))
         if not comment:
             return
         
-        original_author = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (comment['author_id'],))
+        original_author = get_user(comment['author_id'])
         if not original_author or not original_author['notifications_enabled']:
             return
         
-        post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+        post = get_post_meta(post_id)
         if not post:
             return
             
@@ -2025,20 +2670,20 @@ async def notify_user_of_reply(context: ContextTypes.DEFAULT_TYPE, post_id: int,
             replier_display = "Vent author"
             safe_replier_name = replier_display
         else:
-            replier = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (replier_id,))
+            replier = get_user(replier_id)
             replier_name = get_display_name(replier)
-            safe_replier_name = escape_markdown(replier_name, version=2)
+            safe_replier_name = escape_markdown_v2(replier_name)
         
-        post_preview = post['content'][:50] + '...' if len(post['content']) > 50 else post['content']
+        post_preview = clip_text(post['preview'], 50)
         
-        safe_post_preview = escape_markdown(post_preview, version=2)
-        safe_comment_preview = escape_markdown(comment['content'][:100], version=2)
+        safe_post_preview = escape_markdown_v2(post_preview)
+        safe_comment_preview = escape_markdown_v2(comment['content_preview'])
 
         notification_text = (
             f"💬 {safe_replier_name} replied to your comment\\:\n\n"
             f"🗨 {safe_comment_preview}\n\n"
             f"📝 Post\\: {safe_post_preview}\n\n"
-            f"[View conversation](https://t.me/{BOT_USERNAME}?start=comments_{post_id})"
+            f"[View conversation]({COMMENTS_URL_PREFIX}{post_id})"
         )
 
         
@@ -2058,7 +2703,7 @@ async def notify_admin_of_new_post(context: ContextTypes.DEFAULT_TYPE, post_id:
     if not post:
         return
     
-    author = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (post['author_id'],))
+    author = get_user(post['author_id'])
     author_name = get_display_name(author)
     
     # Increased to 4000 characters for full admin review (respects Telegram's 4096 limit)
@@ -2085,24 +2730,24 @@ async def notify_user_of_private_message(context: ContextTypes.DEFAULT_TYPE, sen
     try:
         # Check if receiver has blocked the sender
         is_blocked = db_fetch_one(
-            "SELECT * FROM blocks WHERE blocker_id = %s AND blocked_id = %s",
+            "SELECT 1 FROM blocks WHERE blocker_id = %s AND blocked_id = %s",
             (receiver_id, sender_id)
         )
         if is_blocked:
             return  # Don't notify if blocked
         
-        receiver = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (receiver_id,))
+        receiver = get_user(receiver_id)
         if not receiver or not receiver['notifications_enabled']:
             return
         
-        sender = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (sender_id,))
+        sender = get_user(sender_id)
         sender_name = get_display_name(sender)
         
         # Truncate long messages for the notification
-        preview_content = message_content[:100] + '...' if len(message_content) > 100 else message_content
+        preview_content = clip_text(message_content, 100)
         
-        safe_sender_name = escape_markdown(sender_name, version=2)
-        safe_preview_content = escape_markdown(preview_content, version=2)
+        safe_sender_name = escape_markdown_v2(sender_name)
+        safe_preview_content = escape_markdown_v2(preview_content)
 
         notification_text = (
             f"📩 *New Private Message*\n\n"
@@ -2171,8 +2816,9 @@ async def weekly_test_callback(update: Update, context: ContextTypes.DEFAULT_TYP
 
     winners_info = []
     badges = ["🥇", "🥈", "🥉"]
+    names = get_users_by_ids(u['user_id'] for u in top_users)
     for idx, user_data in enumerate(top_users):
-        u = db_fetch_one("SELECT anonymous_name FROM users WHERE user_id = %s", (user_data['user_id'],))
+        u = names.get(str(user_data['user_id']))
         name = u['anonymous_name'] if u else "Anonymous"
         winners_info.append(f"{badges[idx]} {name} – {user_data['weekly_points']} pts")
 
@@ -2287,8 +2933,9 @@ async def test_weekly_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     winners_info = []
     badges = ["🥇", "🥈", "🥉"]
+    names = get_users_by_ids(u['user_id'] for u in top_users)
     for idx, user_data in enumerate(top_users):
-        u = db_fetch_one("SELECT anonymous_name FROM users WHERE user_id = %s", (user_data['user_id'],))
+        u = names.get(str(user_data['user_id']))
         name = u['anonymous_name'] if u else "Anonymous"
         winners_info.append(f"{badges[idx]} {name} – {user_data['weekly_points']} pts")
     text = "📊 *Weekly Points (Last 7 days)*\n\n" + "\n".join(winners_info) + "\n\n_Admin only – no announcement sent._"
@@ -2918,11 +3565,13 @@ async def approve_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_
             await query.edit_message_text("❌ Post not found.")
         return
     
+    # Reserve the vent number FIRST, under a lock, so concurrent approvals never share one
+    next_vent_number = await run_db(claim_vent_number, post_id)
+    if next_vent_number is None:
+        await query.answer("❌ Post already approved.", show_alert=True)
+        return
+    
     try:
-        # Get the next vent number FIRST
-        max_vent = db_fetch_one("SELECT MAX(vent_number) as max_num FROM posts WHERE approved = TRUE")
-        next_vent_number = (max_vent['max_num'] or 0) + 1
-        
         # Get categories for this post
         cats_row = db_fetch_all("SELECT category_code FROM post_categories WHERE post_id = %s", (post_id,))
         categories = [row['category_code'] for row in cats_row]
@@ -2931,18 +3580,8 @@ async def approve_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_
         # Create the vent number text (copyable format)
         vent_display = f"Vent - {next_vent_number:03d}"
         
-        caption_text = (
-            f"`{vent_display}`\n\n"
-            f"{post['content']}\n\n"
-            f"━━━━━━━━━━━━━━━\n"
-            f"{hashtags}\n"
-            f"[Telegram](https://t.me/christianvent)| [Bot](https://t.me/{BOT_USERNAME})"
-        )
-        
         # Create the comments button
-        kb = InlineKeyboardMarkup([
-            [InlineKeyboardButton("💬 Add/View Comments (0)", url=f"https://t.me/{BOT_USERNAME}?start=comments_{post_id}")]
-        ])
+        kb = comments_kb(post_id, 0)
         
         # Check if this is a thread continuation
         reply_to_message_id = None
@@ -2963,7 +3602,7 @@ async def approve_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_
             f"{safe_content}\n\n"
             f"━━━━━━━━━━━━━━━\n"
             f"{safe_hashtags}\n"
-            f"<a href='https://t.me/christianvent'>Telegram</a> | <a href='https://t.me/{BOT_USERNAME}'>Bot</a>"
+            f"{CHANNEL_POST_FOOTER}"
         )
 
         if post['media_type'] == 'text':
@@ -2994,18 +3633,19 @@ async def approve_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_
                 reply_to_message_id=reply_to_message_id
             )
         else:
+            await run_db(release_vent_number, post_id)
             await query.answer("❌ Unsupported media type.", show_alert=True)
             return
         
-        # Update the post in database with vent number
+        # Publish; the vent number was reserved by claim_vent_number
         success = db_execute(
-            "UPDATE posts SET approved = TRUE, admin_approved_by = %s, channel_message_id = %s, vent_number = %s WHERE post_id = %s",
-            (user_id, msg.message_id, next_vent_number, post_id)
+            "UPDATE posts SET approved = TRUE, admin_approved_by = %s, channel_message_id = %s WHERE post_id = %s",
+            (user_id, msg.message_id, post_id)
         )
         
         # Clear Aura Cache for real-time accuracy
-        calculate_user_rating.cache_clear()
-        format_aura.cache_clear()
+        clear_rating_caches()
+        clear_post_caches()
 
         
         if not success:
@@ -3055,6 +3695,7 @@ async def approve_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_
         
     except Exception as e:
         logger.error(f"Error approving post: {e}")
+        await run_db(release_vent_number, post_id)
         try:
             await query.answer(f"❌ Failed to approve post: {str(e)}", show_alert=True)
         except:
@@ -3094,8 +3735,8 @@ async def finalize_rejection(update: Update, context: ContextTypes.DEFAULT_TYPE,
     """Perform the final rejection after admin makes a choice"""
     user_id = str(update.effective_user.id)
     
-    # Get the post details before deleting
-    post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+    # Get the author before deleting
+    post = db_fetch_one("SELECT author_id FROM posts WHERE post_id = %s", (post_id,))
     if not post:
         logger.warning(f"Post {post_id} not found during finalize_rejection")
         return
@@ -3135,6 +3776,7 @@ async def finalize_rejection(update: Update, context: ContextTypes.DEFAULT_TYPE,
         # I'll just follow the instruction: "Delete the post from DB".
         
         success = db_execute("DELETE FROM posts WHERE post_id = %s", (post_id,))
+        clear_post_caches()
         
         # Clear context flags
         context.user_data.pop('rejecting_post', None)
@@ -3174,8 +3816,8 @@ async def reject_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_i
             await query.edit_message_text("❌ You don't have permission to do this.")
         return
     
-    # Get the post
-    post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+    # Make sure the post still exists
+    post = db_fetch_one("SELECT 1 FROM posts WHERE post_id = %s", (post_id,))
     if not post:
         try:
             await query.answer("❌ Post not found.", show_alert=True)
@@ -3190,7 +3832,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
     
     # Check if user exists and create if not
-    user = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+    user = get_user(user_id)
     if not user:
         anon = create_anonymous_name(user_id)
         is_admin = str(user_id) == str(ADMIN_ID)
@@ -3226,16 +3868,12 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             post_id_str = arg.split("_", 1)[1]
             if post_id_str.isdigit():
                 post_id = int(post_id_str)
-                db_execute(
-                    "UPDATE users SET waiting_for_comment = TRUE, comment_post_id = %s WHERE user_id = %s",
-                    (post_id, user_id)
-                )
+                update_user(user_id, waiting_for_comment=True, comment_post_id=post_id)
                 
-                post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+                preview_md = reply_preview_md(post_id)
                 preview_text = "Original content not found"
-                if post:
-                    content = post['content'][:100] + '...' if len(post['content']) > 100 else post['content']
-                    preview_text = f"💬 *Replying to:*\n{escape_markdown(content, version=2)}"
+                if preview_md is not None:
+                    preview_text = f"💬 *Replying to:*\n{preview_md}"
                 
                 await update.message.reply_text(
                     f"{preview_text}\n\n✍️ Please type your comment or send a voice message, GIF, or sticker:\n\nTap ❌ Cancel to return to menu.",
@@ -3249,19 +3887,18 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 target_user_id = parts[1]
                 post_id = parts[2] if len(parts) >= 3 else None
 
-                user_data = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (target_user_id,))
+                user_data = get_user(target_user_id)
                 if not user_data:
                     await update.message.reply_text("❌ User not found.")
                     return
 
-                followers = db_fetch_all("SELECT * FROM followers WHERE followed_id = %s", (user_data['user_id'],))
                 rating = calculate_user_rating(user_data['user_id'])
                 current_user_id = user_id
 
                 # Determine if this is a vent author context (viewing from a post)
                 is_vent_author = False
                 if post_id:
-                    post_info = db_fetch_one("SELECT author_id FROM posts WHERE post_id = %s", (post_id,))
+                    post_info = get_post_meta(int(post_id))
                     if post_info and str(post_info['author_id']) == str(target_user_id) and str(target_user_id) != str(current_user_id):
                         is_vent_author = True
 
@@ -3282,7 +3919,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     if is_vent_author:
                         btn.append([InlineKeyboardButton(chat_btn_text, callback_data=chat_btn_callback)])
                         # Check block status
-                        is_blocked = db_fetch_one("SELECT * FROM blocks WHERE blocker_id = %s AND blocked_id = %s", (current_user_id, user_data['user_id']))
+                        is_blocked = db_fetch_one("SELECT 1 FROM blocks WHERE blocker_id = %s AND blocked_id = %s", (current_user_id, user_data['user_id']))
                         if is_blocked:
                             btn.append([InlineKeyboardButton("🔓 Unblock User", callback_data=f'unblock_user_{user_data["user_id"]}')])
                         else:
@@ -3290,7 +3927,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     else:
                         # Normal profile: show follow/unfollow, chat, block
                         is_following = db_fetch_one(
-                            "SELECT * FROM followers WHERE follower_id = %s AND followed_id = %s",
+                            "SELECT 1 FROM followers WHERE follower_id = %s AND followed_id = %s",
                             (current_user_id, user_data['user_id'])
                         )
                         if is_following:
@@ -3300,7 +3937,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
                         btn.append([InlineKeyboardButton(chat_btn_text, callback_data=chat_btn_callback)])
 
-                        is_blocked = db_fetch_one("SELECT * FROM blocks WHERE blocker_id = %s AND blocked_id = %s", (current_user_id, user_data['user_id']))
+                        is_blocked = db_fetch_one("SELECT 1 FROM blocks WHERE blocker_id = %s AND blocked_id = %s", (current_user_id, user_data['user_id']))
                         if is_blocked:
                             btn.append([InlineKeyboardButton("🔓 Unblock User", callback_data=f'unblock_user_{user_data["user_id"]}')])
                         else:
@@ -3316,7 +3953,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     display_name = "🛡 Vent author"
                     # Hide stats – we will not include them in the text
                     # We also don't show bio for vent author to keep minimal
-                    profile_text = f"👤 *{escape_markdown(display_name, version=2)}*{' ' + escape_markdown(display_sex, version=2) if display_sex else ''}\n\n"
+                    profile_text = f"👤 *{escape_markdown_v2(display_name)}*{' ' + escape_markdown_v2(display_sex) if display_sex else ''}\n\n"
                     # Only add a note if not self? But we already handle self above.
                     # Add a simple spacer
                     profile_text += "_This is the author of the vent_\n"
@@ -3351,11 +3988,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
                             follower_count = "🔒 Hidden"
                             following_count = "🔒 Hidden"
                         else:
-                            follower_count = str(len(followers))
-                            following_row = db_fetch_one(
-                                "SELECT COUNT(*) as count FROM followers WHERE follower_id = %s", (target_user_id,)
-                            )
-                            following_count = str(following_row['count'] if following_row else 0)
+                            follower_row = get_follow_counts(target_user_id)
+                            follower_count = str(follower_row['followers'])
+                            following_count = str(follower_row['following'])
 
                         hide_role = user_data.get('hide_role')
                     else:
@@ -3363,17 +3998,15 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         level_str = str(level)
                         is_target_admin = user_data.get('is_admin', False)
                         aura_str = "🔵" if is_target_admin else format_aura(rating)
-                        follower_count = str(len(followers))
-                        following_row = db_fetch_one(
-                            "SELECT COUNT(*) as count FROM followers WHERE follower_id = %s", (target_user_id,)
-                        )
-                        following_count = str(following_row['count'] if following_row else 0)
+                        follower_row = get_follow_counts(target_user_id)
+                        follower_count = str(follower_row['followers'])
+                        following_count = str(follower_row['following'])
                         hide_role = False
 
                     is_target_admin = user_data.get('is_admin', False)
-                    safe_name = escape_markdown(display_name, version=2)
-                    safe_sex = escape_markdown(display_sex, version=2)
-                    safe_bio = escape_markdown(bio, version=2)
+                    safe_name = escape_markdown_v2(display_name)
+                    safe_sex = escape_markdown_v2(display_sex)
+                    safe_bio = escape_markdown_v2(bio)
 
                     if is_target_admin:
                         role_display = "Administrator"
@@ -3386,9 +4019,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
                             f"📖 *About:*\n{safe_bio}\n"
                         )
                     else:
-                        safe_level = escape_markdown(level_str, version=2)
-                        safe_rating = escape_markdown(rating_str, version=2)
-                        safe_aura = escape_markdown(aura_str, version=2)
+                        safe_level = escape_markdown_v2(level_str)
+                        safe_rating = escape_markdown_v2(rating_str)
+                        safe_aura = escape_markdown_v2(aura_str)
                         profile_text = (
                             f"👤 *{safe_name}*{' ' + safe_sex if safe_sex else ''}\n\n"
                             f"✨ *Aura Level:* {safe_level} \\({safe_aura}\\)\n"
@@ -3409,17 +4042,18 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
     
     # ----- NO INLINE KEYBOARD – only the reply menu -----
+    menu_markup = get_main_menu(user_id)
     await update.message.reply_text(
         "✝️ *እንኳን ወደ Christian vent በሰላም መጡ* \n\n"
         "ማንነታችሁ ሳይገለጽ ሃሳባችሁን ማጋራት ትችላላችሁ.\n\n",
-        reply_markup=get_main_menu(user_id),
+        reply_markup=menu_markup,
         parse_mode=ParseMode.MARKDOWN
     )
     
     # Also send the reply keyboard (buttons above typing area)
     await update.message.reply_text(
         "You can also use the buttons below to navigate:",
-        reply_markup=get_main_menu(user_id)
+        reply_markup=menu_markup
     )
 
 async def show_inbox(update: Update, context: ContextTypes.DEFAULT_TYPE, page=1):
@@ -3704,12 +4338,12 @@ async def view_individual_message(update: Update, context: ContextTypes.DEFAULT_
     text = (
         f"💬 *Message from {message['sender_name']}*\n"
         f"_{time_ago}_\n\n"
-        f"{escape_markdown(message['content'], version=2)}\n\n"
+        f"{escape_markdown_v2(message['content'])}\n\n"
         f"━━━━━━━━━━━━━━━━━━━━━"
     )
     
     # Check if blocked for toggle
-    is_blocked = db_fetch_one("SELECT * FROM blocks WHERE blocker_id = %s AND blocked_id = %s", (user_id, message['sender_id']))
+    is_blocked = db_fetch_one("SELECT 1 FROM blocks WHERE blocker_id = %s AND blocked_id = %s", (user_id, message['sender_id']))
     block_btn = InlineKeyboardButton("🔓 Unblock", callback_data=f"unblock_user_{message['sender_id']}") if is_blocked else InlineKeyboardButton("⛔ Block", callback_data=f"block_user_{message['sender_id']}")
 
     # Create clean action buttons (like WhatsApp/Telegram)
@@ -3768,7 +4402,7 @@ async def delete_message(update: Update, context: ContextTypes.DEFAULT_TYPE, mes
         return
     
     # Create clean preview
-    preview = message['content'][:50] + '...' if len(message['content']) > 50 else message['content']
+    preview = clip_text(message['content'], 50)
     
     text = (
         f"🗑 *Delete Message?*\n\n"
@@ -3888,7 +4522,7 @@ async def show_messages(update: Update, context: ContextTypes.DEFAULT_TYPE, page
             timestamp = msg['timestamp'].strftime('%b %d, %H:%M')
         sender_sex = msg['sender_sex'] if msg['sender_sex'] in ('👨', '👩') else ""
         messages_text += f"👤 *{msg['sender_name']}*{' ' + sender_sex if sender_sex else ''} ({timestamp}):\n"
-        messages_text += f"{escape_markdown(msg['content'], version=2)}\n\n"
+        messages_text += f"{escape_markdown_v2(msg['content'])}\n\n"
         messages_text += "━━━━━━━━━━━━━━━━━━━━━\n\n"
     
     # Build keyboard with pagination and reply options
@@ -3940,7 +4574,7 @@ async def show_comments_menu(update, context, post_id, page=1):
 
         return
 
-    comment_count = count_all_comments(post_id)
+    comment_count = post['comment_count'] or 0
     keyboard = [
         [InlineKeyboardButton(f"👁 View Comments ({comment_count})", callback_data=f"viewcomments_{post_id}_{page}")],
         [InlineKeyboardButton("✍️ Write Comment", callback_data=f"writecomment_{post_id}")],
@@ -3948,7 +4582,7 @@ async def show_comments_menu(update, context, post_id, page=1):
     ]
 
     post_text = "⚠️ This post has been deleted by the author." if post.get('deleted') else post['content']
-    escaped_text = escape_markdown(post_text, version=2)
+    escaped_text = escape_markdown_v2(post_text)
 
     if hasattr(update, 'message') and update.message:
         await update.message.reply_text(
@@ -3957,67 +4591,143 @@ async def show_comments_menu(update, context, post_id, page=1):
             parse_mode=ParseMode.MARKDOWN_V2
         )
 
+# Built once; the characters telegram.helpers.escape_markdown escapes for version 2
+MARKDOWN_V2_ESCAPE_TABLE = str.maketrans({c: '\\' + c for c in '_*[]()~`>#+-=|{}.!\\'})
+
 def escape_markdown_v2(text):
     """Escape all special characters for MarkdownV2"""
     if not text:
         return ""
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
-    for char in escape_chars:
-        text = text.replace(char, '\\' + char)
-    return text
+    return text.translate(MARKDOWN_V2_ESCAPE_TABLE)
 
-async def send_comment_message(context, chat_id, comment, author_text, reply_to_message_id=None, pre_fetched_data=None):
-    """Helper function to send comments with proper media handling and pre-fetched data support"""
-    comment_id = comment['comment_id']
-    comment_type = comment['type']
-    file_id = comment['file_id']
-    content = comment['content']
-    
-    # Get user reaction for buttons
-    user_id = getattr(context, '_user_id', None)
-    
-    if pre_fetched_data:
-        likes = pre_fetched_data.get('likes', 0)
-        dislikes = pre_fetched_data.get('dislikes', 0)
-        user_reaction_type = pre_fetched_data.get('user_reaction')
+# Thread comments are sent as HTML, which only needs &, < and > escaped
+HTML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+def escape_html(text):
+    """Escape text for ParseMode.HTML message bodies"""
+    if not text:
+        return ""
+    return text.translate(HTML_ESCAPE_TABLE)
+
+@lru_cache(maxsize=4096)
+def format_comment_author(author_id, post_id, sex, avatar_emoji, anonymous_name, is_admin, rating, is_vent_author):
+    """Build the HTML author header of a comment; cached so repeat authors in a thread are escaped once"""
+    profile_link = f"{PROFILE_URL_PREFIX}{author_id}_{post_id}"
+    sex_emoji = sex or '👤'
+    if is_vent_author:
+        # Vent author: show sex emoji + clickable "Vent author" (no custom avatar, no aura)
+        return f'{sex_emoji} <i><a href="{profile_link}">Vent author</a></i>'
+    # Normal user: show full display (sex + custom avatar + name + aura)
+    if sex_emoji in ('👨', '👩'):
+        author_avatar = f"{sex_emoji} {avatar_emoji}" if avatar_emoji else sex_emoji
     else:
-        # Fallback to individual DB queries if no pre-fetched data
-        user_reaction = None
-        if user_id:
-            user_reaction = db_fetch_one(
-                "SELECT type FROM reactions WHERE comment_id = %s AND user_id = %s",
-                (comment_id, user_id)
-            )
-        user_reaction_type = user_reaction['type'] if user_reaction else None
-        
-        likes_row = db_fetch_one(
-            "SELECT COUNT(*) as cnt FROM reactions WHERE comment_id = %s AND type NOT IN ('dislike', '👎', '😡')",
-            (comment_id,)
-        )
-        likes = likes_row['cnt'] if likes_row else 0
-        
-        dislikes_row = db_fetch_one(
-            "SELECT COUNT(*) as cnt FROM reactions WHERE comment_id = %s AND type IN ('dislike', '👎', '😡')",
-            (comment_id,)
-        )
-        dislikes = dislikes_row['cnt'] if dislikes_row else 0
+        author_avatar = avatar_emoji if avatar_emoji else '👤'
+    author_label = f'<i><a href="{profile_link}">{escape_html(anonymous_name or "Anonymous")}</a></i>'
+    aura_text = f"⚡ <i>Aura</i> {rating} {format_aura(rating)}" if not is_admin else ""
+    return f"{author_avatar} {author_label} {aura_text}".strip()
+
+# Shared by every thread render: at most SEND_CONCURRENCY sends in flight and
+# SEND_RATE_LIMIT per second overall (the Bot API's ~30 msg/s budget)
+SEND_CONCURRENCY = 5
+SEND_RATE_LIMIT = 30
+send_gate = None
+send_timestamps = deque()
+
+def get_send_gate():
+    """Create the shared send semaphore lazily, inside the running event loop."""
+    global send_gate
+    if send_gate is None:
+        send_gate = asyncio.Semaphore(SEND_CONCURRENCY)
+    return send_gate
+
+async def throttle_send():
+    """Sliding-window limiter: wait until one more send stays within SEND_RATE_LIMIT/s."""
+    while True:
+        now = time.monotonic()
+        while send_timestamps and now - send_timestamps[0] >= 1:
+            send_timestamps.popleft()
+        if len(send_timestamps) < SEND_RATE_LIMIT:
+            send_timestamps.append(now)
+            return
+        await asyncio.sleep(1 - (now - send_timestamps[0]))
+
+async def send_in_thread_order(items, send, msg_ids=None):
+    """Send threaded comments one at a time, in the order given.
+
+    Messages share one chat, so chat order is the send order; an item whose parent is
+    in the same batch is held back until the parent is out, so replies still thread
+    under the parent message. send(item, msg_ids) returns the new message id.
+    Returns msg_ids updated with {comment_id: message_id}.
+    """
+    msg_ids = {} if msg_ids is None else msg_ids
+    gate = get_send_gate()
+    by_id = {item['comment_id']: item for item in items}
+    sent = set()
+
+    async def send_one(item):
+        cid = item['comment_id']
+        if cid in sent:
+            return
+        sent.add(cid)  # Marked first so a parent cycle cannot recurse forever
+        parent = by_id.get(item.get('parent_comment_id'))
+        if parent:
+            await send_one(parent)
+        try:
+            async with gate:
+                await throttle_send()
+                result = await send(item, msg_ids)
+        except Exception as e:
+            logger.error(f"Error sending comment {cid}: {e}")
+            return
+        if result:
+            msg_ids[cid] = result
+
+    for item in items:
+        await send_one(item)
+    return msg_ids
+
+# Callback data per comment kind: (like prefix, dislike prefix, reply button template)
+COMMENT_KEYBOARD_KINDS = {
+    'comment': ("likecomment_", "dislikecomment_", "reply_{post_id}_{comment_id}"),
+    'reply': ("likereply_", "dislikereply_", "replytoreply_{post_id}_{parent_id}_{comment_id}"),
+}
 
-    like_emoji = "👍" if user_reaction_type == 'like' else "👍"
-    dislike_emoji = "👎" if user_reaction_type == 'dislike' else "👎"
+def build_comment_keyboard(comment, likes, dislikes, viewer_id, user_reaction=None):
+    """Reaction/Reply/Report keyboard for a comment or reply, plus Edit/Delete for its author."""
+    return comment_keyboard(
+        comment['comment_id'], comment['post_id'], comment.get('parent_comment_id') or 0,
+        likes, dislikes, user_reaction, comment['author_id'] == viewer_id,
+        comment['type'] == 'text', comment.get('reply_count') or 0
+    )
+
+@lru_cache(maxsize=4096)
+def comment_keyboard(comment_id, post_id, parent_id, likes, dislikes, user_reaction, is_author, is_text, reply_count):
+    """Cached markup behind build_comment_keyboard; callback strings are formatted once per key"""
+    like_prefix, dislike_prefix, reply_template = COMMENT_KEYBOARD_KINDS['reply' if parent_id else 'comment']
+
+    like_emoji = "👍" if user_reaction == 'like' else "👍"
+    dislike_emoji = "👎" if user_reaction == 'dislike' else "👎"
 
-    # Build keyboard
     kb_buttons = [
         [
-            InlineKeyboardButton(f"{like_emoji} {likes}", callback_data=f"likecomment_{comment_id}"),
-            InlineKeyboardButton(f"{dislike_emoji} {dislikes}", callback_data=f"dislikecomment_{comment_id}"),
-            InlineKeyboardButton("Reply", callback_data=f"reply_{comment['post_id']}_{comment_id}")
+            InlineKeyboardButton(f"{like_emoji} {likes}", callback_data=f"{like_prefix}{comment_id}"),
+            InlineKeyboardButton(f"{dislike_emoji} {dislikes}", callback_data=f"{dislike_prefix}{comment_id}"),
+            InlineKeyboardButton("Reply", callback_data=reply_template.format(
+                post_id=post_id, parent_id=parent_id, comment_id=comment_id
+            ))
         ],
         [InlineKeyboardButton("🚨 Report", callback_data=f"report_comment_{comment_id}")]
     ]
     
+    # Top-level comments start collapsed; replies are fetched when this is tapped
+    if reply_count:
+        kb_buttons.insert(1, [InlineKeyboardButton(
+            f"💬 Show {reply_count} {'reply' if reply_count == 1 else 'replies'}", callback_data=f"show_more_replies_{comment_id}_1_{reply_count}"
+        )])
+    
     # Add edit/delete buttons only for comment author and only for text comments
-    if comment['author_id'] == user_id:
-        if comment_type == 'text':
+    if is_author:
+        if is_text:
             kb_buttons.append([
                 InlineKeyboardButton("✏️ Edit", callback_data=f"edit_comment_{comment_id}"),
                 InlineKeyboardButton("🗑 Delete", callback_data=f"delete_comment_{comment_id}")
@@ -4027,13 +4737,36 @@ async def send_comment_message(context, chat_id, comment, author_text, reply_to_
                 InlineKeyboardButton("🗑 Delete", callback_data=f"delete_comment_{comment_id}")
             ])
     
-    kb = InlineKeyboardMarkup(kb_buttons)
+    return InlineKeyboardMarkup(kb_buttons)
+
+async def send_comment_message(context, chat_id, comment, author_text, reply_to_message_id=None, pre_fetched_data=None):
+    """Helper function to send comments with proper media handling and pre-fetched data support"""
+    comment_id = comment['comment_id']
+    comment_type = comment['type']
+    file_id = comment['file_id']
+    content = comment['content']
+    
+    # Get user reaction for buttons
+    user_id = getattr(context, '_user_id', None)
+    
+    if pre_fetched_data:
+        likes = pre_fetched_data.get('likes', 0)
+        dislikes = pre_fetched_data.get('dislikes', 0)
+        user_reaction_type = pre_fetched_data.get('user_reaction')
+    else:
+        # Fallback to one grouped query if no pre-fetched data
+        data = (await run_db(get_comment_reaction_data, [comment_id], user_id)).get(comment_id, {})
+        likes = data.get('likes', 0)
+        dislikes = data.get('dislikes', 0)
+        user_reaction_type = data.get('user_reaction')
+
+    kb = build_comment_keyboard(comment, likes, dislikes, user_id, user_reaction_type)
 
     # FIX: use dynamic kwargs for reply_to_message_id
     send_kwargs = {
         'chat_id': chat_id,
         'reply_markup': kb,
-        'parse_mode': ParseMode.MARKDOWN_V2
+        'parse_mode': ParseMode.HTML
     }
     
     if isinstance(reply_to_message_id, int) and reply_to_message_id > 0:
@@ -4041,7 +4774,7 @@ async def send_comment_message(context, chat_id, comment, author_text, reply_to_
 
     # Send message based on comment type
     try:
-        escaped_content = escape_markdown_v2(content) if content else ""
+        escaped_content = escape_html(content)
         # FIX: always use comment's own author fields (already built in author_text by callers)
         message_text = f"{escaped_content}\n\n{author_text}" if escaped_content else author_text
         
@@ -4088,7 +4821,7 @@ async def send_comment_message(context, chat_id, comment, author_text, reply_to_
 
         if msg:
             # FIX: Store message ID in database for threading
-            db_execute(
+            await db_execute_async(
                 "UPDATE comments SET telegram_message_id = %s WHERE comment_id = %s",
                 (msg.message_id, comment_id)
             )
@@ -4119,13 +4852,13 @@ async def send_comment_message(context, chat_id, comment, author_text, reply_to_
                         chat_id=chat_id,
                         text=message_text,
                         reply_markup=kb,
-                        parse_mode=ParseMode.MARKDOWN_V2,
+                        parse_mode=ParseMode.HTML,
                         reply_to_message_id=m_msg.message_id,
                         disable_web_page_preview=True
                     )
                 
                 if msg:
-                    db_execute("UPDATE comments SET telegram_message_id = %s WHERE comment_id = %s", (msg.message_id, comment_id))
+                    await db_execute_async("UPDATE comments SET telegram_message_id = %s WHERE comment_id = %s", (msg.message_id, comment_id))
                     return msg.message_id
             except Exception as e2:
                 logger.error(f"Fallback also failed for comment {comment_id}: {e2}")
@@ -4144,34 +4877,74 @@ async def send_comment_message(context, chat_id, comment, author_text, reply_to_
                 disable_web_page_preview=True
             )
             if msg:
-                db_execute("UPDATE comments SET telegram_message_id = %s WHERE comment_id = %s", (msg.message_id, comment_id))
+                await db_execute_async("UPDATE comments SET telegram_message_id = %s WHERE comment_id = %s", (msg.message_id, comment_id))
                 return msg.message_id
         except Exception as e2:
             logger.error(f"Final fallback failed for comment {comment_id}: {e2}")
     
     return None
 
+# (chat_id, post_id, page) -> Event set when that render finishes
+comment_renders_in_flight = {}
+
 async def show_comments_page(update, context, post_id, page=1, reply_pages=None):
+    """Render a comments page; a repeat tap while the same page is still rendering just waits for it"""
+    key = (update.effective_chat.id if update.effective_chat else None, post_id, page)
+    in_flight = comment_renders_in_flight.get(key)
+    if in_flight:
+        await in_flight.wait()
+        return
+    done = comment_renders_in_flight[key] = asyncio.Event()
+    try:
+        await render_comments_page(update, context, post_id, page)
+    finally:
+        del comment_renders_in_flight[key]
+        done.set()
+
+async def render_comments_page(update, context, post_id, page=1):
     if update.effective_chat is None:
         logger.error("Cannot determine chat from update: %s", update)
         return
     chat_id = update.effective_chat.id
+    per_page = 10
+    offset = (page - 1) * per_page
 
-    # Show typing animation
-    await typing_animation(context, chat_id, 0.5)
-    
-    # Show loading message
-    loading_msg = None
-    if page == 1:
+    async def show_typing():
+        try:
+            await context.bot.send_chat_action(chat_id=chat_id, action="typing")
+        except Exception:
+            pass
+
+    async def show_loading():
+        if page != 1:
+            return None
         try:
             if hasattr(update, 'callback_query') and update.callback_query:
-                loading_msg = await update.callback_query.message.edit_text("💬 Loading comments...")
+                return await update.callback_query.message.edit_text("💬 Loading comments...")
             elif hasattr(update, 'message') and update.message:
-                loading_msg = await context.bot.send_message(chat_id, "💬 Loading comments...")
+                return await context.bot.send_message(chat_id, "💬 Loading comments...")
         except:
             pass
+        return None
 
-    post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+    # The typing indicator, loading message, post and page rows don't depend on each
+    # other, so they load at once; only the comment sends below go out one by one.
+    # Only top-level comments are paged; replies load on demand via "Show N replies".
+    # OPTIMIZED: Batch load comments, user data and the top-level count in one query
+    _, loading_msg, post, comments = await asyncio.gather(
+        show_typing(),
+        show_loading(),
+        run_db(get_post_meta, post_id),
+        db_fetch_all_async("""
+            SELECT c.*, u.sex AS user_sex, u.avatar_emoji, u.anonymous_name, u.is_admin,
+                   COUNT(*) OVER () AS total_comments
+            FROM comments c
+            LEFT JOIN users u ON c.author_id = u.user_id
+            WHERE c.post_id = %s AND COALESCE(c.parent_comment_id, 0) = 0
+            ORDER BY c.timestamp ASC
+            LIMIT %s OFFSET %s
+        """, (post_id, per_page, offset))
+    )
     if not post:
         if loading_msg:
             try: await loading_msg.delete()
@@ -4180,25 +4953,22 @@ async def show_comments_page(update, context, post_id, page=1, reply_pages=None)
         return
 
     post_author_id = post['author_id'] if not post.get('deleted') else None
-    per_page = 10
-    offset = (page - 1) * per_page
-
-    # OPTIMIZED: Batch load comments and user data using a JOIN
-    comments = db_fetch_all("""
-        SELECT c.*, u.sex AS user_sex, u.avatar_emoji, u.anonymous_name, u.is_admin
-        FROM comments c
-        LEFT JOIN users u ON c.author_id = u.user_id
-        WHERE c.post_id = %s
-        ORDER BY c.timestamp ASC
-        LIMIT %s OFFSET %s
-    """, (post_id, per_page, offset))
 
     # FIX: Restore sex field from aliased user_sex
     for c in comments:
         c['sex'] = c.pop('user_sex', '👤') or '👤'
 
-    # Count all comments for pagination
-    total_comments = count_all_comments(post_id)
+    # Total for pagination comes with the page rows (window count before LIMIT)
+    if comments:
+        total_comments = comments[0]['total_comments']
+    elif page > 1:
+        row = await db_fetch_one_async(
+            "SELECT COUNT(*) as cnt FROM comments WHERE post_id = %s AND COALESCE(parent_comment_id, 0) = 0",
+            (post_id,)
+        )
+        total_comments = row['cnt'] if row else 0
+    else:
+        total_comments = 0
     total_pages = (total_comments + per_page - 1) // per_page
 
     user_id = str(update.effective_user.id)
@@ -4222,76 +4992,32 @@ async def show_comments_page(update, context, post_id, page=1, reply_pages=None)
         try: await loading_msg.delete()
         except: pass
 
-    # PRE-FETCH: Batch load reactions and parent message IDs
+    # PRE-FETCH: reactions, whole-subtree reply counts (for "Show N replies") and author
+    # ratings don't depend on each other, so they run at once; the sends stay in chat order
     comment_ids = [c['comment_id'] for c in comments]
-    reaction_data = {}
-    parent_msg_ids = {}
-
-    if comment_ids:
-        # Batch counts
-        counts = db_fetch_all("""
-            SELECT comment_id, 
-                   CASE WHEN type IN ('dislike', '👎', '😡') THEN 'dislike' ELSE 'like' END as rgroup,
-                   COUNT(*) as cnt 
-            FROM reactions WHERE comment_id IN %s GROUP BY comment_id, CASE WHEN type IN ('dislike', '👎', '😡') THEN 'dislike' ELSE 'like' END
-        """, (tuple(comment_ids),))
-        for row in counts:
-            cid = row['comment_id']
-            if cid not in reaction_data: reaction_data[cid] = {'likes': 0, 'dislikes': 0, 'user_reaction': None}
-            if row['rgroup'] == 'like': reaction_data[cid]['likes'] = row['cnt']
-            else: reaction_data[cid]['dislikes'] = row['cnt']
-
-        # Batch user reactions
-        u_reacts = db_fetch_all("SELECT comment_id, type FROM reactions WHERE comment_id IN %s AND user_id = %s", (tuple(comment_ids), user_id))
-        for row in u_reacts:
-            cid = row['comment_id']
-            if cid not in reaction_data: reaction_data[cid] = {'likes': 0, 'dislikes': 0, 'user_reaction': None}
-            reaction_data[cid]['user_reaction'] = row['type']
-
-        # Batch parent message IDs for threading
-        parent_ids = [c['parent_comment_id'] for c in comments if c.get('parent_comment_id', 0) != 0]
-        if parent_ids:
-            p_rows = db_fetch_all("SELECT comment_id, telegram_message_id FROM comments WHERE comment_id IN %s", (tuple(parent_ids),))
-            for row in p_rows: parent_msg_ids[row['comment_id']] = row['telegram_message_id']
+    reaction_data, reply_counts, ratings = await asyncio.gather(
+        run_db(get_comment_reaction_data, comment_ids, user_id),
+        run_db(count_comment_replies, comment_ids),
+        run_db(calculate_user_ratings, [c['author_id'] for c in comments])
+    )
+    for c in comments:
+        c['reply_count'] = reply_counts.get(c['comment_id'], 0)
 
     context._user_id = user_id
-    msg_ids = {}
 
-    for comment in comments:
+    async def send_one(comment, msg_ids):
         comment_id = comment['comment_id']
-        parent_id = comment.get('parent_comment_id', 0)
-        
-        # User cached or joined data
-        rating = calculate_user_rating(comment['author_id'])
-        is_author = str(comment['author_id']) == str(post_author_id)
-        
-        profile_link = f"https://t.me/{BOT_USERNAME}?start=profileid_{comment['author_id']}_{post_id}"
-        aura_text = f"⚡ _Aura_ {rating} {format_aura(rating)}" if not comment['is_admin'] else ""
-        
-        if is_author:
-            # Vent author: show sex emoji + clickable "Vent author" (no custom avatar, no aura)
-            sex_emoji = comment.get('sex') or '👤'
-            author_text = f"{sex_emoji} _[{escape_markdown('Vent author', version=2)}]({profile_link})_"
-        else:
-            # Normal user: show full display (sex + custom avatar + name + aura)
-            sex_emoji = comment.get('sex') or '👤'
-            avatar_emoji = comment.get('avatar_emoji')
-            if sex_emoji in ('👨', '👩'):
-                author_avatar = f"{sex_emoji} {avatar_emoji}" if avatar_emoji else sex_emoji
-            else:
-                author_avatar = avatar_emoji if avatar_emoji else '👤'
-            author_label = f"_[{escape_markdown(comment['anonymous_name'] or 'Anonymous', version=2)}]({profile_link})_"
-            author_text = f"{author_avatar} {author_label} {aura_text}".strip()
 
-        # Threading logic - FIX: check current batch msg_ids first
-        reply_to_id = msg_ids.get(parent_id) or parent_msg_ids.get(parent_id)
-        
         # Pre-fetched data for button builder
         pref = reaction_data.get(comment_id, {'likes': 0, 'dislikes': 0, 'user_reaction': None})
         
-        new_msg_id = await send_comment_message(context, chat_id, comment, author_text, reply_to_id, pre_fetched_data=pref)
-        if new_msg_id:
-            msg_ids[comment_id] = new_msg_id
+        return await send_reply_message(
+            context, chat_id, comment, post_author_id, post_id, None,
+            pre_fetched_data=pref, rating=ratings.get(str(comment['author_id']), 0)
+        )
+
+    # In timestamp order; replies wait for their parent so threading holds
+    await send_in_thread_order(comments, send_one)
     
     # Pagination ➕ Add comment button
     is_last_page = page >= total_pages
@@ -4311,12 +5037,13 @@ async def show_comments_page(update, context, post_id, page=1, reply_pages=None)
             "➕ Add your thoughts to the conversation",
             reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("➕ Add comment", callback_data=f"writecomment_{post_id}")]])
         )
-async def send_reply_message(context, chat_id, reply, post_author_id, post_id, reply_to_message_id, pre_fetched_data=None):
-    """Send a single reply message with proper formatting using pre-fetched user data if available"""
-    # Use joined data if available, else fetch
+async def send_reply_message(context, chat_id, reply, post_author_id, post_id, reply_to_message_id, pre_fetched_data=None, reply_user=None, rating=None):
+    """Send one thread comment or reply (shared by all thread renderers), using pre-fetched user data if available"""
+    # Use joined data if available, else the batch-fetched row, else fetch
     is_admin = reply.get('is_admin')
     if is_admin is None: # Not pre-fetched
-        reply_user = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (reply['author_id'],))
+        if reply_user is None:
+            reply_user = await get_user_async(reply['author_id']) or {}
         is_admin = reply_user.get('is_admin', False)
         display_sex = get_display_sex(reply_user)
         display_name = get_display_name(reply_user)
@@ -4326,24 +5053,11 @@ async def send_reply_message(context, chat_id, reply, post_author_id, post_id, r
         display_name = reply.get('anonymous_name') or 'Anonymous'
         avatar_emoji = reply.get('avatar_emoji')
         
-    rating_reply = calculate_user_rating(reply['author_id'])
-    reply_profile_link = f"https://t.me/{BOT_USERNAME}?start=profileid_{reply['author_id']}_{post_id}"
-    aura_text = f"⚡ _Aura_ {rating_reply} {format_aura(rating_reply)}" if not is_admin else ""
-    
-    # Check if reply author is the vent author
-    if str(reply['author_id']) == str(post_author_id):
-        # Vent author reply: clickable "Vent author" with sex emoji
-        sex_emoji = display_sex or '👤'
-        reply_author_text = f"{sex_emoji} _[{escape_markdown('Vent author', version=2)}]({reply_profile_link})_"
-    else:
-        # Normal user
-        author_sex = display_sex or '👤'
-        author_label = f"_[{escape_markdown(display_name, version=2)}]({reply_profile_link})_"
-        if author_sex in ('👨', '👩'):
-            author_avatar = f"{author_sex} {avatar_emoji}" if avatar_emoji else author_sex
-        else:
-            author_avatar = avatar_emoji if avatar_emoji else '👤'
-        reply_author_text = f"{author_avatar} {author_label} {aura_text}".strip()
+    rating_reply = rating if rating is not None else calculate_user_rating(reply['author_id'])
+    reply_author_text = format_comment_author(
+        str(reply['author_id']), post_id, display_sex, avatar_emoji, display_name,
+        bool(is_admin), rating_reply, str(reply['author_id']) == str(post_author_id)
+    )
 
     # Pass pre-fetched reaction data if available (e.g. from show_more_replies)
     # FIX: Pass the full reply dict (already done, but ensured)
@@ -4357,44 +5071,31 @@ async def show_more_replies(update: Update, context: ContextTypes.DEFAULT_TYPE,
     chat_id = update.effective_chat.id
     
     # Get the comment to find its post and telegram_message_id
-    comment = db_fetch_one("SELECT post_id, telegram_message_id FROM comments WHERE comment_id = %s", (comment_id,))
+    comment = await db_fetch_one_async("SELECT post_id, telegram_message_id FROM comments WHERE comment_id = %s", (comment_id,))
     if not comment:
         await query.answer("❌ Comment not found", show_alert=True)
         return
     
     post_id = comment['post_id']
     base_reply_to_id = comment.get('telegram_message_id')
-    post = db_fetch_one("SELECT author_id FROM posts WHERE post_id = %s", (post_id,))
+    post = await run_db(get_post_meta, post_id)
     post_author_id = post['author_id'] if post else None
     
     # Pagination for replies
     replies_per_page = 5
-    # Skip the first 3 replies already shown in the comment view
-    offset = 3 + (page - 1) * replies_per_page
-    
-    # FIX: Get total replies for pagination
-    total_replies_res = db_fetch_one("""
-        WITH RECURSIVE comment_tree AS (
-            SELECT comment_id FROM comments WHERE parent_comment_id = %s
-            UNION ALL
-            SELECT c.comment_id FROM comments c
-            JOIN comment_tree ct ON c.parent_comment_id = ct.comment_id
-        )
-        SELECT COUNT(*) as cnt FROM comment_tree
-    """, (comment_id,))
-    total_replies = total_replies_res['cnt'] if total_replies_res else 0
-    total_pages = (total_replies - 3 + replies_per_page - 1) // replies_per_page
+    offset = (page - 1) * replies_per_page
     
-    # Get replies for this page with user data JOINed
+    # Get replies for this page with user data JOINed; the window count walks the tree only once
     try:
-        replies = db_fetch_all("""
+        replies = await db_fetch_all_async("""
             WITH RECURSIVE comment_tree AS (
                 SELECT * FROM comments WHERE parent_comment_id = %s
                 UNION ALL
                 SELECT c.* FROM comments c
                 JOIN comment_tree ct ON c.parent_comment_id = ct.comment_id
             )
-            SELECT ct.*, u.sex AS user_sex, u.anonymous_name, u.is_admin, u.avatar_emoji
+            SELECT ct.*, u.sex AS user_sex, u.anonymous_name, u.is_admin, u.avatar_emoji,
+                   COUNT(*) OVER () AS total_replies
             FROM comment_tree ct
             LEFT JOIN users u ON ct.author_id = u.user_id
             ORDER BY ct.timestamp ASC LIMIT %s OFFSET %s
@@ -4403,67 +5104,56 @@ async def show_more_replies(update: Update, context: ContextTypes.DEFAULT_TYPE,
         # FIX: Restore sex field from aliased user_sex
         for r in replies:
             r['sex'] = r.pop('user_sex', '👤') or '👤'
+        total_replies = replies[0]['total_replies'] if replies else 0
+        total_pages = (total_replies + replies_per_page - 1) // replies_per_page
             
     except Exception as e:
         logger.error(f"Error fetching more replies for comment {comment_id}: {e}")
         await query.answer("❌ Error loading replies", show_alert=True)
         return
     
-    # Pre-fetch reaction data for replies
+    # Pre-fetch reactions, parent message IDs, authors the JOIN could not resolve and
+    # ratings; they don't depend on each other, so they run at once
     reply_ids = [r['comment_id'] for r in replies]
-    reaction_data = {}
-    parent_msg_ids = {}
+    p_ids = tuple({r['parent_comment_id'] for r in replies})
     user_id = str(update.effective_user.id)
-    
-    if reply_ids:
-        # Batch counts
-        counts = db_fetch_all("""
-            SELECT comment_id, 
-                   CASE WHEN type IN ('dislike', '👎', '😡') THEN 'dislike' ELSE 'like' END as rgroup,
-                   COUNT(*) as cnt 
-            FROM reactions WHERE comment_id IN %s GROUP BY comment_id, CASE WHEN type IN ('dislike', '👎', '😡') THEN 'dislike' ELSE 'like' END
-        """, (tuple(reply_ids),))
-        for row in counts:
-            cid = row['comment_id']
-            if cid not in reaction_data: reaction_data[cid] = {'likes': 0, 'dislikes': 0, 'user_reaction': None}
-            if row['rgroup'] == 'like': reaction_data[cid]['likes'] = row['cnt']
-            else: reaction_data[cid]['dislikes'] = row['cnt']
-            
-        # Batch user reactions
-        u_reacts = db_fetch_all("SELECT comment_id, type FROM reactions WHERE comment_id IN %s AND user_id = %s", (tuple(reply_ids), user_id))
-        for row in u_reacts:
-            cid = row['comment_id']
-            if cid not in reaction_data: reaction_data[cid] = {'likes': 0, 'dislikes': 0, 'user_reaction': None}
-            reaction_data[cid]['user_reaction'] = row['type']
-
-        # Batch parent message IDs
-        p_ids = [r['parent_comment_id'] for r in replies]
-        if p_ids:
-            p_rows = db_fetch_all("SELECT comment_id, telegram_message_id FROM comments WHERE comment_id IN %s", (tuple(p_ids),))
-            for row in p_rows: parent_msg_ids[row['comment_id']] = row['telegram_message_id']
-
-    # Delete the "Show more replies" button
-    try: await query.message.delete()
-    except: pass
-    
-    msg_ids = {comment_id: base_reply_to_id}
-
-    for reply in replies:
+    reaction_data, p_rows, reply_users, ratings = await asyncio.gather(
+        run_db(get_comment_reaction_data, reply_ids, user_id),
+        db_fetch_all_async("SELECT comment_id, telegram_message_id FROM comments WHERE comment_id IN %s", (p_ids,)) if p_ids else asyncio.sleep(0, []),
+        run_db(get_users_by_ids, [r['author_id'] for r in replies if r.get('is_admin') is None]),
+        run_db(calculate_user_ratings, [r['author_id'] for r in replies])
+    )
+    parent_msg_ids = {row['comment_id']: row['telegram_message_id'] for row in p_rows}
+
+    if page == 1:
+        # Tapped on the comment itself: drop its "Show N replies" row so it is not resent
         try:
-            pid = reply.get('parent_comment_id')
-            target_msg_id = msg_ids.get(pid) or parent_msg_ids.get(pid) or base_reply_to_id
-            
-            pref = reaction_data.get(reply['comment_id'], {'likes': 0, 'dislikes': 0, 'user_reaction': None})
-            reply_msg_id = await send_reply_message(context, chat_id, reply, post_author_id, post_id, target_msg_id, pre_fetched_data=pref)
-            
-            if reply_msg_id:
-                msg_ids[reply['comment_id']] = reply_msg_id
-        except Exception as e:
-            logger.error(f"Error sending reply {reply.get('comment_id')}: {e}")
+            rows = [row for row in query.message.reply_markup.inline_keyboard
+                    if not (row and (row[0].callback_data or '').startswith('show_more_replies_'))]
+            await query.message.edit_reply_markup(reply_markup=InlineKeyboardMarkup(rows))
+        except Exception:
+            pass
+    else:
+        # Delete the "Show more replies" button
+        try: await query.message.delete()
+        except: pass
+    
+    async def send_one(reply, msg_ids):
+        pid = reply.get('parent_comment_id')
+        target_msg_id = msg_ids.get(pid) or parent_msg_ids.get(pid) or base_reply_to_id
+        
+        pref = reaction_data.get(reply['comment_id'], {'likes': 0, 'dislikes': 0, 'user_reaction': None})
+        return await send_reply_message(
+            context, chat_id, reply, post_author_id, post_id, target_msg_id,
+            pre_fetched_data=pref, reply_user=reply_users.get(str(reply['author_id']), {}),
+            rating=ratings.get(str(reply['author_id']), 0)
+        )
+
+    await send_in_thread_order(replies, send_one, msg_ids={comment_id: base_reply_to_id})
     
     # If there are more replies, show another "Show more" button
     if page < total_pages:
-        remaining = total_replies - (3 + page * replies_per_page)
+        remaining = total_replies - page * replies_per_page
         if remaining > 0:
             keyboard = InlineKeyboardMarkup([
                 [InlineKeyboardButton(
@@ -4473,8 +5163,8 @@ async def show_more_replies(update: Update, context: ContextTypes.DEFAULT_TYPE,
             ])
             
             # Try to get the reply_to_message_id safely
-            reply_to_id = None
-            if query.message and query.message.reply_to_message:
+            reply_to_id = base_reply_to_id if page == 1 else None
+            if page > 1 and query.message and query.message.reply_to_message:
                 reply_to_id = query.message.reply_to_message.message_id
                 
             try:
@@ -4517,7 +5207,7 @@ async def menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def send_updated_profile(user_id: str, chat_id: int, context: ContextTypes.DEFAULT_TYPE):
-    user = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+    user = get_user(user_id)
     if not user:
         return
     
@@ -4531,20 +5221,13 @@ async def send_updated_profile(user_id: str, chat_id: int, context: ContextTypes
 
     
     
-    followers = db_fetch_all(
-        "SELECT * FROM followers WHERE followed_id = %s",
-        (user_id,)
-    )
-    
     bio = user.get('bio', 'No bio set.')
     level = (rating // 10) + 1
-    follower_count = len(followers)
 
-    # Fetch following count (users this person follows)
-    following_row = db_fetch_one(
-        "SELECT COUNT(*) as count FROM followers WHERE follower_id = %s", (user_id,)
-    )
-    following_count = following_row['count'] if following_row else 0
+    # Follower and following counts in one query
+    follow_counts = get_follow_counts(user_id)
+    follower_count = follow_counts['followers']
+    following_count = follow_counts['following']
     
     # PREMIUM Grid Layout
     kb = InlineKeyboardMarkup([
@@ -4571,12 +5254,12 @@ async def send_updated_profile(user_id: str, chat_id: int, context: ContextTypes
     is_admin = user.get('is_admin', False)
     
     # Standardize escaping for V2
-    safe_name = escape_markdown(display_name, version=2)
-    safe_sex = escape_markdown(display_sex, version=2)
-    safe_bio = escape_markdown(bio, version=2)
-    safe_level = escape_markdown(str(level), version=2)
-    safe_rating = escape_markdown(str(rating), version=2)
-    safe_aura = escape_markdown("🔵" if is_admin else format_aura(rating), version=2)
+    safe_name = escape_markdown_v2(display_name)
+    safe_sex = escape_markdown_v2(display_sex)
+    safe_bio = escape_markdown_v2(bio)
+    safe_level = escape_markdown_v2(str(level))
+    safe_rating = escape_markdown_v2(str(rating))
+    safe_aura = escape_markdown_v2("🔵" if is_admin else format_aura(rating))
 
     if is_admin:
         profile_text = (
@@ -4664,7 +5347,8 @@ async def show_previous_posts(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     # Get user's posts with pagination (newest first)
     posts = db_fetch_all(
-        "SELECT * FROM posts WHERE author_id = %s AND approved = TRUE AND deleted = FALSE ORDER BY timestamp DESC LIMIT %s OFFSET %s",
+        """SELECT p.* FROM posts p WHERE author_id = %s AND approved = TRUE AND deleted = FALSE
+        ORDER BY timestamp DESC LIMIT %s OFFSET %s""",
         (user_id, per_page, offset)
     )
     
@@ -4734,8 +5418,7 @@ async def show_previous_posts(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Clean snippet for button text
         clean_snippet = snippet.replace('*', '').replace('_', '').replace('`', '').strip()
         
-        # Get comment count for this post
-        comment_count = count_all_comments(post['post_id'])
+        comment_count = post['comment_count'] or 0
         
         # Create button for each post with post number and snippet
         button_text = f"#{post_number} - {clean_snippet} ({comment_count}💬)"
@@ -4892,8 +5575,8 @@ async def view_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id:
         return
     
     # Format the post content
-    escaped_content = escape_markdown(post['content'], version=2)
-    escaped_categories = escape_markdown(post['categories'] or 'None', version=2)
+    escaped_content = escape_markdown_v2(post['content'])
+    escaped_categories = escape_markdown_v2(post['categories'] or 'None')
     
     # Format timestamp
     if isinstance(post['timestamp'], str):
@@ -4901,8 +5584,8 @@ async def view_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id:
     else:
         timestamp = post['timestamp'].strftime('%b %d, %Y at %H:%M')
     
-    # Get comment count
-    comment_count = count_all_comments(post_id)
+    # Stored count, kept current by save_comment
+    comment_count = post['comment_count'] or 0
     
     # Build the post detail text
     text = (
@@ -4910,7 +5593,7 @@ async def view_post(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id:
         f"━━━━━━━━━━━━━━━━━━━━━\n\n"
         f"🆔 **Post ID:** \\#{post['post_id']}\n"
         f"📌 **Categories:** {escaped_categories}\n"
-        f"📅 **Posted on:** {escape_markdown(timestamp, version=2)}\n"
+        f"📅 **Posted on:** {escape_markdown_v2(timestamp)}\n"
         f"💬 **Comments:** {comment_count}\n\n"
         f"━━━━━━━━━━━━━━━━━━━━━\n\n"
         f"**Content:**\n\n"
@@ -4999,17 +5682,17 @@ async def show_my_comments(update: Update, context: ContextTypes.DEFAULT_TYPE, p
         
         reply_markup = InlineKeyboardMarkup(keyboard)
     else:
-        safe_page = escape_markdown(str(page), version=2)
-        safe_total_pages = escape_markdown(str(total_pages), version=2)
+        safe_page = escape_markdown_v2(str(page))
+        safe_total_pages = escape_markdown_v2(str(total_pages))
         text = f"💬 *My Comments* \\(Page {safe_page}/{safe_total_pages}\\)\n\n"
         
         for idx, comment in enumerate(comments):
             comment_num = (page - 1) * per_page + idx + 1
-            safe_num = escape_markdown(str(comment_num), version=2)
+            safe_num = escape_markdown_v2(str(comment_num))
             
             # Truncate content
-            comment_preview = comment['content'][:80] + '...' if len(comment['content']) > 80 else comment['content']
-            safe_comment_preview = escape_markdown(comment_preview, version=2)
+            comment_preview = clip_text(comment['content'], 80)
+            safe_comment_preview = escape_markdown_v2(comment_preview)
             
             text += f"*{safe_num}\\.* {safe_comment_preview}\n\n"
 
@@ -5117,13 +5800,13 @@ def get_pending_reports(offset: int = 0, limit: int = 5):
 def get_report_content_preview(target_type: str, target_id: int):
     """Return (preview_text, author_id) for a reported post or comment."""
     if target_type == 'post':
-        row = db_fetch_one("SELECT content, author_id FROM posts WHERE post_id = %s", (target_id,))
+        row = db_fetch_one("SELECT LEFT(content, 100) AS content, author_id FROM posts WHERE post_id = %s", (target_id,))
         if row:
-            return row['content'][:100], row['author_id']
+            return row['content'], row['author_id']
     elif target_type == 'comment':
-        row = db_fetch_one("SELECT content, author_id FROM comments WHERE comment_id = %s", (target_id,))
+        row = db_fetch_one("SELECT LEFT(content, 100) AS content, author_id FROM comments WHERE comment_id = %s", (target_id,))
         if row:
-            return (row['content'] or '[media]')[:100], row['author_id']
+            return row['content'] or '[media]', row['author_id']
     return None, None
 
 
@@ -5177,9 +5860,9 @@ async def show_admin_reports(update: Update, context: ContextTypes.DEFAULT_TYPE,
         preview = (preview or '[deleted]')[:60]
         type_label = "Post" if rep['target_type'] == 'post' else "Comment"
         reporter_name = rep.get('reporter_name') or 'Anonymous'
-        safe_preview = escape_markdown(preview, version=2)
-        safe_reporter = escape_markdown(reporter_name, version=2)
-        safe_reason = escape_markdown(rep['reason'], version=2)
+        safe_preview = escape_markdown_v2(preview)
+        safe_reporter = escape_markdown_v2(reporter_name)
+        safe_reason = escape_markdown_v2(rep['reason'])
 
         lines.append(
             f"🆔 *Report \\#{rep['report_id']}* \\- {type_label}\n"
@@ -5235,8 +5918,8 @@ async def notify_admin_of_new_report(
         reporter = db_fetch_one("SELECT anonymous_name FROM users WHERE user_id = %s", (reporter_id,))
         reporter_name = reporter['anonymous_name'] if reporter else 'Anonymous'
         type_label = "Post" if target_type == 'post' else "Comment"
-        safe_reason = escape_markdown(reason, version=2)
-        safe_name = escape_markdown(reporter_name, version=2)
+        safe_reason = escape_markdown_v2(reason)
+        safe_name = escape_markdown_v2(reporter_name)
         text = (
             f"🚨 *New Report \\#{report_id}*\n"
             f"Type: {type_label}\n"
@@ -5255,11 +5938,61 @@ async def notify_admin_of_new_report(
     except Exception as e:
         logger.error(f"Error notifying admin of report: {e}")
 
+async def handle_comment_reaction(query, context: ContextTypes.DEFAULT_TYPE, user_id: str, comment_id: int, reaction_type: str):
+    """Toggle a like/dislike from a comment or reply keyboard and redraw it in place"""
+    try:
+        # Toggle/upsert the reaction (one transaction) while the comment row loads on another connection
+        counts, comment = await asyncio.gather(
+            run_db(toggle_comment_reaction, comment_id, user_id, reaction_type),
+            db_fetch_one_async(
+                "SELECT comment_id, post_id, parent_comment_id, author_id, type, content FROM comments WHERE comment_id = %s",
+                (comment_id,)
+            )
+        )
+        if not comment:
+            clear_rating_caches()
+            await query.answer("Comment not found", show_alert=True)
+            return
+
+        # Only the comment author's aura moved; keep everyone else's cached
+        forget_user_rating(comment['author_id'])
+
+        # Keep a still-collapsed "💬 Show N replies" row; its count is part of the cached keyboard key
+        old_rows = query.message.reply_markup.inline_keyboard if query.message.reply_markup else ()
+        for row in old_rows:
+            if row and (row[0].callback_data or '').startswith('show_more_replies_'):
+                m = SHOW_REPLIES_COUNT.fullmatch(row[0].callback_data)
+                if m:
+                    comment['reply_count'] = int(m[1])
+                else:
+                    # Buttons sent before the count was in the data
+                    comment['reply_count'] = (await run_db(count_comment_replies, [comment_id])).get(comment_id, 0)
+                break
+        new_kb = build_comment_keyboard(comment, counts['likes'], counts['dislikes'], user_id, counts['user_reaction'])
+        # Markups compare by their buttons; an unchanged keyboard would only earn "not modified"
+        if new_kb != query.message.reply_markup:
+            try:
+                await context.bot.edit_message_reply_markup(
+                    chat_id=query.message.chat_id,
+                    message_id=query.message.message_id,
+                    reply_markup=new_kb
+                )
+            except BadRequest as e:
+                if "Message is not modified" not in str(e):
+                    logger.error(f"Error updating reaction buttons: {e}")
+        
+        # Send notification in background (only when the reaction was added or switched)
+        if counts['user_reaction'] == reaction_type:
+            asyncio.create_task(send_reaction_notification(context, comment, user_id, reaction_type, comment['post_id']))
+    except Exception as e:
+        logger.error(f"Error processing reaction: {e}")
+        await query.answer("❌ Error updating reaction", show_alert=True)
+
 async def send_reaction_notification(context: ContextTypes.DEFAULT_TYPE, comment: dict, reactor_id: str, reaction_type: str, post_id: int):
     """Background helper to send interaction notification"""
     try:
         # Resolve identities
-        post = db_fetch_one("SELECT content, author_id FROM posts WHERE post_id = %s", (post_id,))
+        post = get_post_meta(post_id)
         comment_author = db_fetch_one("SELECT user_id, anonymous_name FROM users WHERE user_id = %s", (comment['author_id'],))
         
         # Don't notify yourself
@@ -5274,27 +6007,152 @@ async def send_reaction_notification(context: ContextTypes.DEFAULT_TYPE, comment
             reactor_display = reactor['anonymous_name'] if reactor else "Anonymous"
         
         # Content formatting
-        post_preview = post['content'][:50] + '...' if post and len(post['content']) > 50 else (post['content'] if post else "")
+        post_preview = clip_text(post['preview'], 50) if post else ""
         reaction_label = "liked 👍" if reaction_type == 'like' else "disliked 👎"
         reaction_icon = "✨" if reaction_type == 'like' else "⚠️"
         
         notification_text = (
             f"{reaction_icon} *New Interaction\\!*\n\n"
-            f"👤 {escape_markdown(reactor_display, version=2)} *{reaction_label}* your comment\\:\n\n"
-            f"🗨 _{escape_markdown((comment['content'] or '[media]')[:150], version=2)}_\n\n"
-            f"📝 *Post Context\\:*\n{escape_markdown(post_preview, version=2)}\n\n"
-            f"🔗 [View Discussion](https://t.me/{BOT_USERNAME}?start=comments_{post_id})"
+            f"👤 {escape_markdown_v2(reactor_display)} *{reaction_label}* your comment\\:\n\n"
+            f"🗨 _{escape_markdown_v2((comment['content'] or '[media]')[:150])}_\n\n"
+            f"📝 *Post Context\\:*\n{escape_markdown_v2(post_preview)}\n\n"
+            f"🔗 [View Discussion]({COMMENTS_URL_PREFIX}{post_id})"
+        )
+        
+        await context.bot.send_message(
+            chat_id=comment_author['user_id'],
+            text=notification_text,
+            parse_mode=ParseMode.MARKDOWN_V2
         )
+    except Exception as e:
+        logger.error(f"Reaction notification failed: {e}")
+
+# ==================== END REPORTING HELPERS ====================
+
+async def reaction_callback(reaction_type, update, context, user_id, rest):
+    """like*/dislike* comment and reply buttons; rest is the comment id"""
+    if rest.isdigit():
+        await handle_comment_reaction(update.callback_query, context, user_id, int(rest), reaction_type)
+
+# Argument shapes of the multi-id thread buttons, parsed in one match
+VIEWCOMMENTS_ARGS = re.compile(r'(\d+)_(\d+)(?:_|$)')
+REPLYTOREPLY_ARGS = re.compile(r'(\d+)_\d+_(\d+)')
+REPLY_ARGS = re.compile(r'(\d+)_(\d+)')
+SHOW_MORE_REPLIES_ARGS = re.compile(r'more_replies_(\d+)_(\d+)(?:_\d+)?')
+# First-page button data also carries the reply count, so a keyboard redraw can keep it
+SHOW_REPLIES_COUNT = re.compile(r'show_more_replies_\d+_1_(\d+)')
+
+async def viewcomments_callback(update, context, user_id, rest):
+    """viewcomments_<post_id>_<page> buttons"""
+    query = update.callback_query
+    await query.answer("🔄 Loading comments...", show_alert=False)
+    # Malformed data is just ignored; real failures reach button_handler's error reply
+    m = VIEWCOMMENTS_ARGS.match(rest)
+    if m:
+        await show_comments_page(update, context, int(m[1]), int(m[2]))
+
+async def prompt_comment_reply(query, user_id, post_id, comment_id):
+    """Put the user in reply mode for a comment and ask for the reply"""
+    await update_user_async(user_id, waiting_for_comment=True, comment_post_id=post_id, comment_idx=comment_id)
+    
+    await query.message.reply_text(
+        "↩️ Please type your reply or send a voice message, GIF, or sticker:\n\nTap ❌ Cancel to return to menu.",
+        reply_markup=cancel_menu,
+        parse_mode=ParseMode.HTML
+    )
+
+async def replytoreply_callback(update, context, user_id, rest):
+    """replytoreply_<post_id>_<parent_id>_<comment_id> buttons"""
+    m = REPLYTOREPLY_ARGS.fullmatch(rest)
+    if m:
+        await prompt_comment_reply(update.callback_query, user_id, int(m[1]), int(m[2]))
+
+async def reply_msg_callback(update, context, user_id, target_id):
+    """reply_msg_<user_id> buttons under private messages (requires an accepted chat)"""
+    query = update.callback_query
+    if not target_id or not target_id.isdigit():
+        await query.answer("❌ Invalid ID", show_alert=True)
+        return
+        
+    check = await db_fetch_one_async("""
+        SELECT 1 FROM chat_requests 
+        WHERE (sender_id = %s AND receiver_id = %s AND status = 'accepted')
+           OR (sender_id = %s AND receiver_id = %s AND status = 'accepted')
+    """, (user_id, target_id, target_id, user_id))
+    pm_check = await db_fetch_one_async("""
+        SELECT 1 FROM private_messages 
+        WHERE (sender_id = %s AND receiver_id = %s)
+           OR (sender_id = %s AND receiver_id = %s)
+    """, (user_id, target_id, target_id, user_id))
+    
+    if not check and not pm_check:
+        await query.answer("❌ No active chat permission.", show_alert=True)
+        return
+
+    await update_user_async(user_id, waiting_for_private_message=True, private_message_target=target_id)
+    target_user = await db_fetch_one_async("SELECT anonymous_name FROM users WHERE user_id = %s", (target_id,))
+    await query.message.reply_text(f"↩️ *Replying to {target_user['anonymous_name']}*\n\nPlease type your message:", parse_mode=ParseMode.MARKDOWN, reply_markup=cancel_menu)
+
+async def reply_callback(update, context, user_id, rest):
+    """reply_<post_id>_<comment_id> comment buttons and reply_msg_<user_id> private message buttons"""
+    if rest.startswith('msg_'):
+        await reply_msg_callback(update, context, user_id, rest[len('msg_'):])
+        return
+    m = REPLY_ARGS.fullmatch(rest)
+    if m:
+        await prompt_comment_reply(update.callback_query, user_id, int(m[1]), int(m[2]))
+
+async def show_more_replies_callback(update, context, user_id, rest):
+    """show_more_replies_<comment_id>_<page>[_<reply_count>] buttons"""
+    m = SHOW_MORE_REPLIES_ARGS.fullmatch(rest)
+    if m:
+        await show_more_replies(update, context, int(m[1]), int(m[2]))
+    else:
+        await update.callback_query.answer("❌ Error loading more replies", show_alert=True)
+
+async def writecomment_callback(update, context, user_id, rest):
+    """writecomment_<post_id> buttons"""
+    query = update.callback_query
+    await query.answer("✍️ Opening Writer...", show_alert=False)
+    if rest.isdigit():
+        await update_user_async(user_id, waiting_for_comment=True, comment_post_id=int(rest))
         
-        await context.bot.send_message(
-            chat_id=comment_author['user_id'],
-            text=notification_text,
-            parse_mode=ParseMode.MARKDOWN_V2
+        await query.message.reply_text(
+            "✍️ Please type your comment or send a voice message, GIF, or sticker:\n\nTap ❌ Cancel to return to menu.",
+            reply_markup=cancel_menu,
+            parse_mode=ParseMode.HTML
         )
-    except Exception as e:
-        logger.error(f"Reaction notification failed: {e}")
 
-# ==================== END REPORTING HELPERS ====================
+# The hottest thread buttons, dispatched on the text before the first '_'
+# instead of walking button_handler's startswith chain
+THREAD_CALLBACKS = {
+    'likecomment': partial(reaction_callback, 'like'),
+    'likereply': partial(reaction_callback, 'like'),
+    'dislikecomment': partial(reaction_callback, 'dislike'),
+    'dislikereply': partial(reaction_callback, 'dislike'),
+    'viewcomments': viewcomments_callback,
+    'writecomment': writecomment_callback,
+    'replytoreply': replytoreply_callback,
+    'reply': reply_callback,
+    'show': show_more_replies_callback,
+}
+
+# Thread buttons that don't touch the user's waiting state, so they need not wait
+# for earlier updates (comment pages, reply pages and like/dislike toggles)
+NONBLOCKING_THREAD_CALLBACKS = re.compile(r'(viewcomments|show|likecomment|likereply|dislikecomment|dislikereply)_')
+
+async def thread_view_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Non-blocking entry for NONBLOCKING_THREAD_CALLBACKS buttons"""
+    query = update.callback_query
+    prefix, _, rest = query.data.partition('_')
+    try:
+        await THREAD_CALLBACKS[prefix](update, context, str(query.from_user.id), rest)
+    except Exception as e:
+        logger.error(f"Error in thread_view_handler: {e}")
+        try:
+            await query.message.reply_text("❌ An error occurred. Please try again.")
+        except:
+            pass
 
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
@@ -5312,6 +6170,12 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if query.data == 'noop':
             return  # Do nothing and exit the function
             
+        prefix, _, rest = query.data.partition('_')
+        thread_callback = THREAD_CALLBACKS.get(prefix)
+        if thread_callback:
+            await thread_callback(update, context, user_id, rest)
+            return
+
         if query.data == 'ask':
             context.user_data['selected_categories'] = set()
             await query.message.reply_text(
@@ -5358,15 +6222,12 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 return
             
             # Check if this is a thread continuation
-            user_data = db_fetch_one("SELECT thread_context_post_id FROM users WHERE user_id = %s", (user_id,))
+            user_data = await db_fetch_one_async("SELECT thread_context_post_id FROM users WHERE user_id = %s", (user_id,))
             if user_data and user_data.get('thread_context_post_id'):
                 context.user_data['thread_from_post_id'] = user_data['thread_context_post_id']
             
             # Store selected categories in user's DB record
-            db_execute(
-                "UPDATE users SET selected_categories = %s, waiting_for_post = TRUE WHERE user_id = %s",
-                (','.join(selected), user_id)
-            )
+            await update_user_async(user_id, selected_categories=','.join(selected), waiting_for_post=True)
             
             await query.message.reply_text(
                 f"✍️ *Selected: {', '.join(selected)}*\n\nNow send your post content (text, photo, or voice).",
@@ -5427,23 +6288,17 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await show_settings(update, context)
 
         elif query.data == 'toggle_notifications':
-            current = db_fetch_one("SELECT notifications_enabled FROM users WHERE user_id = %s", (user_id,))
+            current = await db_fetch_one_async("SELECT notifications_enabled FROM users WHERE user_id = %s", (user_id,))
             if current:
                 new_value = not current['notifications_enabled']
-                db_execute(
-                    "UPDATE users SET notifications_enabled = %s WHERE user_id = %s",
-                    (new_value, user_id)
-                )
+                await update_user_async(user_id, notifications_enabled=new_value)
             await show_settings(update, context)
         
         elif query.data == 'toggle_privacy':
-            current = db_fetch_one("SELECT privacy_public FROM users WHERE user_id = %s", (user_id,))
+            current = await db_fetch_one_async("SELECT privacy_public FROM users WHERE user_id = %s", (user_id,))
             if current:
                 new_value = not current['privacy_public']
-                db_execute(
-                    "UPDATE users SET privacy_public = %s WHERE user_id = %s",
-                    (new_value, user_id)
-                )
+                await update_user_async(user_id, privacy_public=new_value)
             await show_settings(update, context)
 
         elif query.data == 'privacy_settings':
@@ -5454,10 +6309,10 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             col = f"hide_{metric}"
             
             # Simple toggle logic
-            current = db_fetch_one(f"SELECT {col} FROM users WHERE user_id = %s", (user_id,))
+            current = await db_fetch_one_async(f"SELECT {col} FROM users WHERE user_id = %s", (user_id,))
             if current:
                 new_val = not current[col]
-                db_execute(f"UPDATE users SET {col} = %s WHERE user_id = %s", (new_val, user_id))
+                await update_user_async(user_id, **{col: new_val})
                 status = "Hidden" if new_val else "Visible"
                 await query.answer(f"✅ {metric.replace('_', ' ').title()} is now {status}", show_alert=False)
             
@@ -5465,34 +6320,15 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         elif query.data == 'help':
             await query.answer("ℹ️ Loading Help...", show_alert=False)
-            help_text = (
-                "ℹ️ *የዚህ ቦት አጠቃቀም:*\n"
-                "•  menu button በመጠቀም የተለያዩ አማራጮችን ማየት ይችላሉ.\n"
-                "• 'Share My Thoughts' የሚለውን በመንካት በፈለጉት ነገር ጥያቄም ሆነ ሃሳብ መጻፍ ይችላሉ.\n"
-                "•  category ወይም መደብ በመምረጥ በ ጽሁፍ፣ ፎቶ እና ድምጽ ሃሳቦን ማንሳት ይችላሉ.\n"
-                "• እርስዎ ባነሱት ሃሳብ ላይ ሌሎች ሰዎች አስተያየት መጻፍ ይችላሉ\n"
-                "• View your profile የሚለውን በመንካት ስም፣ ጾታዎን መቀየር እንዲሁም እርስዎን የሚከተሉ ሰዎች ብዛት ማየት ይችላሉ.\n"
-                "• በተነሱ ጥያቄዎች ላይ ከቻናሉ comments የሚለድን በመጫን አስተያየትዎን መጻፍ ይችላሉ."
-            )
-            keyboard = [[InlineKeyboardButton("📱 Main Menu", callback_data='menu')]]
-            await query.message.reply_text(help_text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode=ParseMode.MARKDOWN)
+            await edit_or_reply(query, HELP_TEXT_AM, reply_markup=MENU_ONLY_KB, parse_mode=ParseMode.MARKDOWN)
 
         elif query.data == 'about':
             await query.answer("ℹ️ Loading About...", show_alert=False)
-            about_text = (
-                "👤 Creator: Yididiya Tamiru\n\n"
-                "🔗 Telegram: @YIDIDIYATAMIRUU\n"
-                "🙏 This bot helps you share your thoughts anonymously with the Christian community."
-            )
-            keyboard = [[InlineKeyboardButton("📱 Main Menu", callback_data='menu')]]
-            await query.message.reply_text(about_text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode=ParseMode.MARKDOWN)
+            await edit_or_reply(query, ABOUT_TEXT, reply_markup=MENU_ONLY_KB, parse_mode=ParseMode.MARKDOWN)
 
         elif query.data == 'edit_name':
             await query.answer("✏️ Renaming...", show_alert=False)
-            db_execute(
-                "UPDATE users SET awaiting_name = TRUE WHERE user_id = %s",
-                (user_id,)
-            )
+            await update_user_async(user_id, awaiting_name=True)
             await query.message.reply_text(
                 "✏️ Please type your new anonymous name:\n\nTap ❌ Cancel to return to menu.",
                 parse_mode=ParseMode.MARKDOWN,
@@ -5501,10 +6337,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         elif query.data == 'edit_bio':
             await query.answer("📝 Opening Bio Editor...", show_alert=False)
-            db_execute(
-                "UPDATE users SET awaiting_bio = TRUE WHERE user_id = %s",
-                (user_id,)
-            )
+            await update_user_async(user_id, awaiting_bio=True)
             await query.message.reply_text(
                 "📝 *Please type your new bio:*\n\nKeep it short and interesting (max 150 chars).\n\nTap ❌ Cancel to return to menu.",
                 parse_mode=ParseMode.MARKDOWN,
@@ -5530,10 +6363,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             else:
                 sex = '👤'  # fallback
             
-            db_execute(
-                "UPDATE users SET sex = %s WHERE user_id = %s",
-                (sex, user_id)
-            )
+            await update_user_async(user_id, sex=sex)
             await query.message.reply_text("✅ Sex updated!")
             await send_updated_profile(user_id, query.message.chat.id, context)
 
@@ -5541,38 +6371,33 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.answer("👤 Updating Follow...", show_alert=False)
             target_uid = query.data.split('_', 1)[1]
             if query.data.startswith('follow_'):
-                try:
-                    db_execute(
-                        "INSERT INTO followers (follower_id, followed_id) VALUES (%s, %s)",
-                        (user_id, target_uid)
-                    )
-                    # Notify the followed user if they have notifications enabled
-                    followed_user = db_fetch_one(
-                        "SELECT notifications_enabled FROM users WHERE user_id = %s", (target_uid,)
-                    )
-                    if followed_user and followed_user['notifications_enabled']:
-                        follower_data = db_fetch_one(
-                            "SELECT anonymous_name, avatar_emoji FROM users WHERE user_id = %s", (user_id,)
-                        )
-                        if follower_data:
-                            follower_name = follower_data.get('avatar_emoji') or ''
-                            follower_name = f"{follower_name} {follower_data['anonymous_name']}".strip()
-                            try:
-                                await context.bot.send_message(
-                                    chat_id=target_uid,
-                                    text=(
-                                        f"🔔 *New Follower!*\n"
-                                        f"👤 *{follower_name}* started following you.\n"
-                                        f"👉 View their profile: /start profileid_{user_id}"
-                                    ),
-                                    parse_mode=ParseMode.MARKDOWN
-                                )
-                            except Exception as notify_err:
-                                logger.warning(f"Could not notify user {target_uid} of follow: {notify_err}")
-                except psycopg2.IntegrityError:
-                    pass
+                # ON CONFLICT instead of catching IntegrityError: no failed statement to roll back
+                inserted = await db_fetch_one_async(
+                    "INSERT INTO followers (follower_id, followed_id) VALUES (%s, %s) "
+                    "ON CONFLICT DO NOTHING RETURNING followed_id",
+                    (user_id, target_uid)
+                )
+                # Notify the followed user (only on a new follow) if they have notifications enabled
+                followed_user = await get_user_async(target_uid) if inserted else None
+                if followed_user and followed_user['notifications_enabled']:
+                    follower_data = await get_user_async(user_id)
+                    if follower_data:
+                        follower_name = follower_data.get('avatar_emoji') or ''
+                        follower_name = f"{follower_name} {follower_data['anonymous_name']}".strip()
+                        try:
+                            await context.bot.send_message(
+                                chat_id=target_uid,
+                                text=(
+                                    f"🔔 *New Follower!*\n"
+                                    f"👤 *{follower_name}* started following you.\n"
+                                    f"👉 View their profile: /start profileid_{user_id}"
+                                ),
+                                parse_mode=ParseMode.MARKDOWN
+                            )
+                        except Exception as notify_err:
+                            logger.warning(f"Could not notify user {target_uid} of follow: {notify_err}")
             else:
-                db_execute(
+                await db_execute_async(
                     "DELETE FROM followers WHERE follower_id = %s AND followed_id = %s",
                     (user_id, target_uid)
                 )
@@ -5587,13 +6412,13 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 page = 1
             per_page = 10
             offset = (page - 1) * per_page
-            rows = db_fetch_all(
+            rows = await db_fetch_all_async(
                 "SELECT u.user_id, u.anonymous_name, u.avatar_emoji FROM followers f "
                 "JOIN users u ON f.follower_id = u.user_id "
                 "WHERE f.followed_id = %s ORDER BY u.anonymous_name LIMIT %s OFFSET %s",
                 (user_id, per_page, offset)
             )
-            total_row = db_fetch_one(
+            total_row = await db_fetch_one_async(
                 "SELECT COUNT(*) as cnt FROM followers WHERE followed_id = %s", (user_id,)
             )
             total = total_row['cnt'] if total_row else 0
@@ -5628,13 +6453,13 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 page = 1
             per_page = 10
             offset = (page - 1) * per_page
-            rows = db_fetch_all(
+            rows = await db_fetch_all_async(
                 "SELECT u.user_id, u.anonymous_name, u.avatar_emoji FROM followers f "
                 "JOIN users u ON f.followed_id = u.user_id "
                 "WHERE f.follower_id = %s ORDER BY u.anonymous_name LIMIT %s OFFSET %s",
                 (user_id, per_page, offset)
             )
-            total_row = db_fetch_one(
+            total_row = await db_fetch_one_async(
                 "SELECT COUNT(*) as cnt FROM followers WHERE follower_id = %s", (user_id,)
             )
             total = total_row['cnt'] if total_row else 0
@@ -5661,174 +6486,10 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     parse_mode=ParseMode.MARKDOWN
                 )
 
-        elif query.data.startswith('viewcomments_'):
-            await query.answer("🔄 Loading comments...", show_alert=False)
-            try:
-                parts = query.data.split('_')
-                if len(parts) >= 3 and parts[1].isdigit() and parts[2].isdigit():
-                    post_id = int(parts[1])
-                    page = int(parts[2])
-                    await show_comments_page(update, context, post_id, page)
-            except Exception as e:
-                logger.error(f"ViewComments error: {e}")
-                await query.answer("❌ Error loading comments")
-  
-        elif query.data.startswith('writecomment_'):
-            await query.answer("✍️ Opening Writer...", show_alert=False)
-            post_id_str = query.data.split('_', 1)[1]
-            if post_id_str.isdigit():
-                post_id = int(post_id_str)
-                db_execute(
-                    "UPDATE users SET waiting_for_comment = TRUE, comment_post_id = %s WHERE user_id = %s",
-                    (post_id, user_id)
-                )
-                
-                await query.message.reply_text(
-                    "✍️ Please type your comment or send a voice message, GIF, or sticker:\n\nTap ❌ Cancel to return to menu.",
-                    reply_markup=cancel_menu,
-                    parse_mode=ParseMode.HTML
-                )
-                return
-        # FIXED: Like/Dislike reaction handling
-        elif query.data.startswith(("likecomment_", "dislikecomment_", "likereply_", "dislikereply_")):
-            try:
-                parts = query.data.split('_')
-                comment_id = int(parts[1])
-                reaction_type = 'like' if parts[0] in ('likecomment', 'likereply') else 'dislike'
-
-                # Check if user already has a reaction on this comment
-                existing_reaction = db_fetch_one(
-                    "SELECT type FROM reactions WHERE comment_id = %s AND user_id = %s",
-                    (comment_id, user_id)
-                )
-
-                if existing_reaction:
-                    is_existing_like = existing_reaction['type'] not in ('dislike', '👎', '😡')
-                    is_new_like = reaction_type == 'like'
-                    if is_existing_like == is_new_like:
-                        # User is clicking the same reaction group - remove it (toggle off)
-                        db_execute(
-                            "DELETE FROM reactions WHERE comment_id = %s AND user_id = %s",
-                            (comment_id, user_id)
-                        )
-                    else:
-                        # User is changing reaction group - update it
-                        db_execute(
-                            "UPDATE reactions SET type = %s WHERE comment_id = %s AND user_id = %s",
-                            (reaction_type, comment_id, user_id)
-                        )
-                else:
-                    # User is adding a new reaction
-                    db_execute(
-                        "INSERT INTO reactions (comment_id, user_id, type) VALUES (%s, %s, %s)",
-                        (comment_id, user_id, reaction_type)
-                    )
-                
-                # Clear Aura Cache
-                calculate_user_rating.cache_clear()
-                format_aura.cache_clear()
-
-                # Get updated counts
-                likes_row = db_fetch_one(
-                    "SELECT COUNT(*) as cnt FROM reactions WHERE comment_id = %s AND type NOT IN ('dislike', '👎', '😡')",
-                    (comment_id,)
-                )
-                likes = likes_row['cnt'] if likes_row else 0
-                
-                dislikes_row = db_fetch_one(
-                    "SELECT COUNT(*) as cnt FROM reactions WHERE comment_id = %s AND type IN ('dislike', '👎', '😡')",
-                    (comment_id,)
-                )
-                dislikes = dislikes_row['cnt'] if dislikes_row else 0
-
-                comment = db_fetch_one(
-                    "SELECT post_id, parent_comment_id, author_id, type, content FROM comments WHERE comment_id = %s",
-                    (comment_id,)
-                )
-                if not comment:
-                    await query.answer("Comment not found", show_alert=True)
-                    return
-
-                post_id = comment['post_id']
-                parent_comment_id = comment['parent_comment_id']
-
-                # Get user's current reaction after update
-                user_reaction = db_fetch_one(
-                    "SELECT type FROM reactions WHERE comment_id = %s AND user_id = %s",
-                    (comment_id, user_id)
-                )
-
-                like_emoji = "👍" if user_reaction and user_reaction['type'] == 'like' else "👍"
-                dislike_emoji = "👎" if user_reaction and user_reaction['type'] == 'dislike' else "👎"
-
-                if parent_comment_id == 0:
-                    # Build keyboard with edit/delete buttons for author
-                    kb_buttons = [
-                        [
-                            InlineKeyboardButton(f"{like_emoji} {likes}", callback_data=f"likecomment_{comment_id}"),
-                            InlineKeyboardButton(f"{dislike_emoji} {dislikes}", callback_data=f"dislikecomment_{comment_id}"),
-                            InlineKeyboardButton("Reply", callback_data=f"reply_{post_id}_{comment_id}")
-                        ]
-                    ]
-                    
-                    # Add edit/delete buttons only for comment author and only for text comments
-                    if comment['author_id'] == user_id:
-                        if comment['type'] == 'text':
-                            kb_buttons.append([
-                                InlineKeyboardButton("✏️ Edit", callback_data=f"edit_comment_{comment_id}"),
-                                InlineKeyboardButton("🗑 Delete", callback_data=f"delete_comment_{comment_id}")
-                            ])
-                        else:
-                            kb_buttons.append([
-                                InlineKeyboardButton("🗑 Delete", callback_data=f"delete_comment_{comment_id}")
-                            ])
-                    
-                    new_kb = InlineKeyboardMarkup(kb_buttons)
-                else:
-                    # Build keyboard for replies with edit/delete buttons for author
-                    kb_buttons = [
-                        [
-                            InlineKeyboardButton(f"{like_emoji} {likes}", callback_data=f"likereply_{comment_id}"),
-                            InlineKeyboardButton(f"{dislike_emoji} {dislikes}", callback_data=f"dislikereply_{comment_id}"),
-                            InlineKeyboardButton("Reply", callback_data=f"replytoreply_{post_id}_{parent_comment_id}_{comment_id}")
-                        ]
-                    ]
-                    
-                    # Add edit/delete buttons only for reply author and only for text comments
-                    if comment['author_id'] == user_id:
-                        if comment['type'] == 'text':
-                            kb_buttons.append([
-                                InlineKeyboardButton("✏️ Edit", callback_data=f"edit_comment_{comment_id}"),
-                                InlineKeyboardButton("🗑 Delete", callback_data=f"delete_comment_{comment_id}")
-                            ])
-                        else:
-                            kb_buttons.append([
-                                InlineKeyboardButton("🗑 Delete", callback_data=f"delete_comment_{comment_id}")
-                            ])
-                    
-                    new_kb = InlineKeyboardMarkup(kb_buttons)
-
-                try:
-                    await context.bot.edit_message_reply_markup(
-                        chat_id=query.message.chat_id,
-                        message_id=query.message.message_id,
-                        reply_markup=new_kb
-                    )
-                except BadRequest as e:
-                    if "Message is not modified" not in str(e):
-                        logger.error(f"Error updating reaction buttons: {e}")
-                
-                # Send notification in background
-                if not existing_reaction or existing_reaction['type'] != reaction_type:
-                    asyncio.create_task(send_reaction_notification(context, comment, user_id, reaction_type, post_id))
-            except Exception as e:
-                logger.error(f"Error processing reaction: {e}")
-                await query.answer("❌ Error updating reaction", show_alert=True)
-
         # NEW: Handle edit comment
         elif query.data.startswith("edit_comment_"):
             comment_id = int(query.data.split('_')[2])
-            comment = db_fetch_one("SELECT * FROM comments WHERE comment_id = %s", (comment_id,))
+            comment = await db_fetch_one_async("SELECT author_id, type, content FROM comments WHERE comment_id = %s", (comment_id,))
             
             if comment and comment['author_id'] == user_id:
                 if comment['type'] != 'text':
@@ -5864,18 +6525,11 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # NEW: Handle delete comment
         elif query.data.startswith("delete_comment_"):
             comment_id = int(query.data.split('_')[2])
-            comment = db_fetch_one("SELECT * FROM comments WHERE comment_id = %s", (comment_id,))
+            comment = await db_fetch_one_async("SELECT author_id, post_id FROM comments WHERE comment_id = %s", (comment_id,))
             
             if comment and comment['author_id'] == user_id:
-                # Get post_id before deleting for updating comment count
-                post_id = comment['post_id']
-                
-                # Orphan Adoption: Become top-level first
-                db_execute("UPDATE comments SET parent_comment_id = 0 WHERE parent_comment_id = %s", (comment_id,))
-                
-                # Delete the comment and its reactions
-                db_execute("DELETE FROM reactions WHERE comment_id = %s", (comment_id,))
-                db_execute("DELETE FROM comments WHERE comment_id = %s", (comment_id,))
+                # Orphan adoption, reaction cleanup and the delete commit together
+                post_id = await run_db(delete_comment, comment_id) or comment['post_id']
                 
                 await query.answer("✅ Comment deleted")
                 await query.message.delete()
@@ -5896,7 +6550,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 if len(parts) > 3:
                     from_page = int(parts[3])
                 
-                post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+                post = await run_db(get_post_meta, post_id)
                 
                 if post and post['author_id'] == user_id:
                     # Ask for confirmation with page info
@@ -5924,7 +6578,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 post_id = int(parts[3])
                 from_page = int(parts[4]) if len(parts) > 4 else 1
                 
-                post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+                post = await db_fetch_one_async("SELECT * FROM posts WHERE post_id = %s", (post_id,))
                 
                 if post and post['author_id'] == user_id:
                     if post['channel_message_id']:
@@ -5947,7 +6601,8 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         except Exception as e:
                             logger.error(f"Error editing channel message: {e}")
                     
-                    db_execute("UPDATE posts SET deleted = TRUE WHERE post_id = %s", (post_id,))
+                    await db_execute_async("UPDATE posts SET deleted = TRUE WHERE post_id = %s", (post_id,))
+                    clear_post_caches()
                     
                     await query.answer("✅ Post deleted successfully")
                     await query.message.edit_text(
@@ -5983,7 +6638,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 return
 
             # Check for existing request
-            existing = db_fetch_one(
+            existing = await db_fetch_one_async(
                 "SELECT status FROM chat_requests WHERE sender_id = %s AND receiver_id = %s",
                 (user_id, target_id)
             )
@@ -5991,7 +6646,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if existing:
                 if existing['status'] == 'accepted':
                     await query.answer("✅ Request already accepted!", show_alert=False)
-                    db_execute("UPDATE users SET waiting_for_private_message = TRUE, private_message_target = %s WHERE user_id = %s", (target_id, user_id))
+                    await update_user_async(user_id, waiting_for_private_message=True, private_message_target=target_id)
                     await query.message.reply_text("✉️ Type your message below:", reply_markup=cancel_menu)
                 else:
                     await query.answer("⏳ Chat request is still pending...", show_alert=True)
@@ -5999,26 +6654,26 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             # Create new request
             try:
-                db_execute(
+                await db_execute_async(
                     "INSERT INTO chat_requests (sender_id, receiver_id, status) VALUES (%s, %s, 'pending')",
                     (user_id, target_id)
                 )
                 await query.answer("✉️ Chat request sent!", show_alert=False)
                 
                 # Notify receiver
-                sender_data = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+                sender_data = await get_user_async(user_id)
                 sender_name = get_display_name(sender_data)
                 
                 receiver_text = (
                     f"🔔 *New Chat Request\\!*\n"
-                    f"_{escape_markdown(sender_name, version=2)}_ wants to chat with you\\."
+                    f"_{escape_markdown_v2(sender_name)}_ wants to chat with you\\."
                 )
                 receiver_kb = InlineKeyboardMarkup([
                     [
                         InlineKeyboardButton("✅ Accept", callback_data=f'acceptchat_{user_id}'),
                         InlineKeyboardButton("❌ Ignore", callback_data=f'declinechat_{user_id}')
                     ],
-                    [InlineKeyboardButton("👤 View Profile", url=f'https://t.me/{BOT_USERNAME}?start=profileid_{user_id}')]
+                    [InlineKeyboardButton("👤 View Profile", url=f'{PROFILE_URL_PREFIX}{user_id}')]
                 ])
                 
                 await context.bot.send_message(
@@ -6033,12 +6688,12 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         elif query.data.startswith('acceptchat_'):
             sender_id = query.data.split('_')[1]
-            db_execute(
+            await db_execute_async(
                 "UPDATE chat_requests SET status = 'accepted' WHERE sender_id = %s AND receiver_id = %s",
                 (sender_id, user_id)
             )
             # Mutual chat permission
-            db_execute(
+            await db_execute_async(
                 "INSERT INTO chat_requests (sender_id, receiver_id, status) VALUES (%s, %s, 'accepted') ON CONFLICT DO NOTHING",
                 (user_id, sender_id)
             )
@@ -6046,101 +6701,34 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.answer("✅ Request accepted!", show_alert=False)
             await query.message.edit_text("✅ *You accepted the chat request\\!*", parse_mode=ParseMode.MARKDOWN_V2)
             
-            receiver_data = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+            receiver_data = await get_user_async(user_id)
             receiver_name = get_display_name(receiver_data)
             try:
                 await context.bot.send_message(
                     chat_id=sender_id,
-                    text=f"✅ *{escape_markdown(receiver_name, version=2)}* accepted your chat request\\! You can now send messages from their profile\\.",
+                    text=f"✅ *{escape_markdown_v2(receiver_name)}* accepted your chat request\\! You can now send messages from their profile\\.",
                     parse_mode=ParseMode.MARKDOWN_V2
                 )
             except: pass
 
         elif query.data.startswith('declinechat_'):
             sender_id = query.data.split('_')[1]
-            db_execute("DELETE FROM chat_requests WHERE sender_id = %s AND receiver_id = %s", (sender_id, user_id))
+            await db_execute_async("DELETE FROM chat_requests WHERE sender_id = %s AND receiver_id = %s", (sender_id, user_id))
             await query.answer("Request ignored.", show_alert=False)
             await query.message.edit_text("🗑️ *Chat request ignored\\.*", parse_mode=ParseMode.MARKDOWN_V2)
 
         elif query.data.startswith('message_'):
             target_id = query.data.split('_')[1]
-            check = db_fetch_one("SELECT status FROM chat_requests WHERE sender_id = %s AND receiver_id = %s", (user_id, target_id))
+            check = await db_fetch_one_async("SELECT status FROM chat_requests WHERE sender_id = %s AND receiver_id = %s", (user_id, target_id))
             
             if not check or check['status'] != 'accepted':
                 await query.answer("❌ You must send a chat request first!", show_alert=True)
                 return
 
             await query.answer("✉️ Opening Chat...", show_alert=False)
-            db_execute("UPDATE users SET waiting_for_private_message = TRUE, private_message_target = %s WHERE user_id = %s", (target_id, user_id))
+            await update_user_async(user_id, waiting_for_private_message=True, private_message_target=target_id)
             await query.message.reply_text("✉️ *Please type your private message:*\n\nTap ❌ Cancel to return to menu.", parse_mode=ParseMode.MARKDOWN, reply_markup=cancel_menu)
         
-        elif query.data.startswith('reply_msg_'):
-            # Existing reply logic (requires accepted chat as well)
-            target_id = query.data[len('reply_msg_'):]
-            if not target_id or not target_id.isdigit():
-                await query.answer("❌ Invalid ID", show_alert=True)
-                return
-                
-            check = db_fetch_one("""
-                SELECT 1 FROM chat_requests 
-                WHERE (sender_id = %s AND receiver_id = %s AND status = 'accepted')
-                   OR (sender_id = %s AND receiver_id = %s AND status = 'accepted')
-            """, (user_id, target_id, target_id, user_id))
-            pm_check = db_fetch_one("""
-                SELECT 1 FROM private_messages 
-                WHERE (sender_id = %s AND receiver_id = %s)
-                   OR (sender_id = %s AND receiver_id = %s)
-            """, (user_id, target_id, target_id, user_id))
-            
-            if not check and not pm_check:
-                await query.answer("❌ No active chat permission.", show_alert=True)
-                return
-
-            db_execute("UPDATE users SET waiting_for_private_message = TRUE, private_message_target = %s WHERE user_id = %s", (target_id, user_id))
-            target_user = db_fetch_one("SELECT anonymous_name FROM users WHERE user_id = %s", (target_id,))
-            await query.message.reply_text(f"↩️ *Replying to {target_user['anonymous_name']}*\n\nPlease type your message:", parse_mode=ParseMode.MARKDOWN, reply_markup=cancel_menu)
-
-        elif query.data.startswith("reply_"):
-            parts = query.data.split("_")
-            if len(parts) == 3:
-                post_id = int(parts[1])
-                comment_id = int(parts[2])
-                db_execute(
-                    "UPDATE users SET waiting_for_comment = TRUE, comment_post_id = %s, comment_idx = %s WHERE user_id = %s",
-                    (post_id, comment_id, user_id)
-                )
-                
-                await query.message.reply_text(
-                    "↩️ Please type your reply or send a voice message, GIF, or sticker:\n\nTap ❌ Cancel to return to menu.",
-                    reply_markup=cancel_menu,
-                    parse_mode=ParseMode.HTML
-                )
-                
-        elif query.data.startswith("replytoreply_"):
-            parts = query.data.split("_")
-            if len(parts) == 4:
-                post_id = int(parts[1])
-                comment_id = int(parts[3])
-                db_execute(
-                    "UPDATE users SET waiting_for_comment = TRUE, comment_post_id = %s, comment_idx = %s WHERE user_id = %s",
-                    (post_id, comment_id, user_id)
-                )
-                
-                await query.message.reply_text(
-                    "↩️ Please type your reply or send a voice message, GIF, or sticker:\n\nTap ❌ Cancel to return to menu.",
-                    reply_markup=cancel_menu,
-                    parse_mode=ParseMode.HTML
-                )
-        # UPDATED: Handle Previous Posts pagination
-        elif query.data.startswith('show_more_replies_'):
-            try:
-                parts = query.data.split('_')
-                comment_id = int(parts[3])
-                page = int(parts[4])
-                await show_more_replies(update, context, comment_id, page)
-            except (IndexError, ValueError) as e:
-                logger.error(f"Error parsing show_more_replies: {e}")
-                await query.answer("❌ Error loading more replies", show_alert=True)
         elif query.data.startswith("previous_posts_"):
             try:
                 page = int(query.data.split('_')[2])
@@ -6212,10 +6800,10 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data.startswith('view_comment_'):
             try:
                 comment_id = int(query.data.split('_')[2])
-                comment = db_fetch_one("SELECT * FROM comments WHERE comment_id = %s", (comment_id,))
+                comment = await db_fetch_one_async("SELECT author_id, post_id, content, timestamp FROM comments WHERE comment_id = %s", (comment_id,))
                 
                 if comment and comment['author_id'] == user_id:
-                    post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (comment['post_id'],))
+                    post = await run_db(get_post_meta, comment['post_id'])
                     
                     if post:
                         keyboard = [
@@ -6225,13 +6813,13 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         ]
                         
                         # Show comment details
-                        comment_preview = comment['content'][:200] + '...' if len(comment['content']) > 200 else comment['content']
-                        post_preview = post['content'][:100] + '...' if len(post['content']) > 100 else post['content']
+                        comment_preview = clip_text(comment['content'], 200)
+                        post_preview = clip_text(post['preview'], 100)
                         
                         text = (
                             f"💬 *Comment Details*\n\n"
-                            f"📄 **Post:** {escape_markdown(post_preview, version=2)}\n\n"
-                            f"🗨 **Your Comment:**\n{escape_markdown(comment_preview, version=2)}\n\n"
+                            f"📄 **Post:** {escape_markdown_v2(post_preview)}\n\n"
+                            f"🗨 **Your Comment:**\n{escape_markdown_v2(comment_preview)}\n\n"
                             f"📅 **Posted on:** {comment['timestamp'].strftime('%Y-%m-%d %H:%M') if not isinstance(comment['timestamp'], str) else comment['timestamp'][:16]}"
                         )
                         
@@ -6249,12 +6837,12 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # UPDATED: Handle continue post (threading) - renamed from elaborate
         elif query.data.startswith("continue_post_"):
             post_id = int(query.data.split('_')[2])
-            post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+            post = await run_db(get_post_meta, post_id)
             
             if post and post['author_id'] == user_id:
                 context.user_data['thread_from_post_id'] = post_id
                 # Save to DB for persistence
-                db_execute("UPDATE users SET thread_context_post_id = %s WHERE user_id = %s", (post_id, user_id))
+                await update_user_async(user_id, thread_context_post_id=post_id)
                 # Use multi-category selection
                 context.user_data['selected_categories'] = set()
                 await query.message.reply_text(
@@ -6365,30 +6953,13 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 media_id = pending_post.get('media_id')
                 thread_from_post_id = pending_post.get('thread_from_post_id')
                 
-                # Insert post (without 'category' column which was dropped)
-                if thread_from_post_id:
-                    post_row = db_execute(
-                        "INSERT INTO posts (content, author_id, media_type, media_id, thread_from_post_id) VALUES (%s, %s, %s, %s, %s) RETURNING post_id",
-                        (post_content, user_id, media_type, media_id, thread_from_post_id),
-                        fetchone=True
-                    )
-                else:
-                    post_row = db_execute(
-                        "INSERT INTO posts (content, author_id, media_type, media_id) VALUES (%s, %s, %s, %s) RETURNING post_id",
-                        (post_content, user_id, media_type, media_id),
-                        fetchone=True
-                    )
-                
-                if post_row:
-                    post_id = post_row['post_id']
-                    
-                    # Insert categories into junction table
-                    category_list = category.split(',') if category else []
-                    for cat_code in category_list:
-                        db_execute(
-                            "INSERT INTO post_categories (post_id, category_code) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                            (post_id, cat_code.strip())
-                        )
+                # Insert the post and its categories together
+                category_codes = [code.strip() for code in category.split(',')] if category else []
+                try:
+                    post_id = await run_db(save_post, post_content, user_id, media_type, media_id, thread_from_post_id, category_codes)
+                except Exception:
+                    post_id = None
+                clear_post_caches()
                 
                 # Clean up user data
                 if 'pending_post' in context.user_data:
@@ -6398,8 +6969,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 if 'editing_post' in context.user_data:
                     del context.user_data['editing_post']
                 
-                if post_row:
-                    post_id = post_row['post_id']
+                if post_id:
                     await notify_admin_of_new_post(context, post_id)
                     
                     # Replace loading with success animation
@@ -6410,16 +6980,15 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     
                     await asyncio.sleep(1)
                     
-                    keyboard = [[InlineKeyboardButton("📱 Main Menu", callback_data='menu')]]
                     try:
                         await success_msg.edit_text(
                             "✅ Your post has been submitted for admin approval!\nYou'll be notified when it's approved and published.",
-                            reply_markup=InlineKeyboardMarkup(keyboard)
+                            reply_markup=MENU_ONLY_KB
                         )
                     except:
                         await success_msg.edit_caption(
                             "✅ Your post has been submitted for admin approval!\nYou'll be notified when it's approved and published.",
-                            reply_markup=InlineKeyboardMarkup(keyboard)
+                            reply_markup=MENU_ONLY_KB
                         )
                 else:
                     try:
@@ -6594,18 +7163,18 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
         elif query.data.startswith('set_avatar_'):
             emoji = query.data.split('_', 2)[2]
-            db_execute("UPDATE users SET avatar_emoji = %s WHERE user_id = %s", (emoji, user_id))
+            await update_user_async(user_id, avatar_emoji=emoji)
             await query.answer(f"✅ Avatar set to {emoji}!", show_alert=True)
             await send_updated_profile(user_id, query.message.chat.id, context)
             
         elif query.data == 'clear_avatar':
-            db_execute("UPDATE users SET avatar_emoji = NULL WHERE user_id = %s", (user_id,))
+            await update_user_async(user_id, avatar_emoji=None)
             await query.answer("✅ Avatar removed!", show_alert=True)
             await send_updated_profile(user_id, query.message.chat.id, context)
             
         elif query.data == 'list_blocked':
             await query.answer("🚫 Loading blocked users...", show_alert=False)
-            blocked = db_fetch_all(
+            blocked = await db_fetch_all_async(
                 """SELECT u.user_id, u.anonymous_name, u.sex 
                 FROM blocks b JOIN users u ON b.blocked_id = u.user_id 
                 WHERE b.blocker_id = %s""",
@@ -6624,7 +7193,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             kb = []
             for b_user in blocked:
                 name = get_display_name(b_user)
-                text += f"• {escape_markdown(name, version=2)}\n"
+                text += f"• {escape_markdown_v2(name)}\n"
                 kb.append([InlineKeyboardButton(f"🔓 Unblock {name}", callback_data=f"unblock_user_{b_user['user_id']}")])
             
             kb.append([InlineKeyboardButton("◀️ Back to Settings", callback_data='settings')])
@@ -6632,18 +7201,17 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         elif query.data.startswith('unblock_user_'):
             target_id = query.data.split('_', 2)[2]
-            db_execute("DELETE FROM blocks WHERE blocker_id = %s AND blocked_id = %s", (user_id, target_id))
+            await db_execute_async("DELETE FROM blocks WHERE blocker_id = %s AND blocked_id = %s", (user_id, target_id))
             
             # Clear Aura Cache for real-time accuracy
-            calculate_user_rating.cache_clear()
-            format_aura.cache_clear()
+            clear_rating_caches()
             
             await query.answer("✅ User unblocked!", show_alert=False)
             
             # Refresh view (either profiles or list)
             if "Blocked Users" in query.message.text:
                 # If we are in the list, refresh the list
-                blocked = db_fetch_all(
+                blocked = await db_fetch_all_async(
                     "SELECT u.user_id, u.anonymous_name, u.sex FROM blocks b JOIN users u ON b.blocked_id = u.user_id WHERE b.blocker_id = %s",
                     (user_id,)
                 )
@@ -6654,7 +7222,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     kb = []
                     for b_user in blocked:
                         name = get_display_name(b_user)
-                        text += f"• {escape_markdown(name, version=2)}\n"
+                        text += f"• {escape_markdown_v2(name)}\n"
                         kb.append([InlineKeyboardButton(f"🔓 Unblock {name}", callback_data=f"unblock_user_{b_user['user_id']}")])
                     kb.append([InlineKeyboardButton("◀️ Back", callback_data='settings')])
                     await query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(kb), parse_mode=ParseMode.MARKDOWN_V2)
@@ -6666,20 +7234,18 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data.startswith('block_user_'):
             target_id = query.data.split('_', 2)[2]
             
-            # Add to blocks table
-            try:
-                db_execute(
-                    "INSERT INTO blocks (blocker_id, blocked_id) VALUES (%s, %s)",
-                    (user_id, target_id)
-                )
-                
-                # Clear Aura Cache for real-time accuracy
-                calculate_user_rating.cache_clear()
-                format_aura.cache_clear()
+            # Add to blocks table; a duplicate is a no-op instead of a failed, rolled-back INSERT
+            blocked = await db_execute_async(
+                "INSERT INTO blocks (blocker_id, blocked_id) VALUES (%s, %s) "
+                "ON CONFLICT DO NOTHING RETURNING blocked_id",
+                (user_id, target_id), fetchone=True
+            )
+            if blocked:
+                # Only the blocked user's aura changes
+                forget_user_rating(target_id)
                 
                 await query.message.reply_text("✅ User has been blocked. They can no longer send you messages.")
-
-            except psycopg2.IntegrityError:
+            else:
                 await query.message.reply_text("❌ User is already blocked.")
 
         # ==================== REPORTING CALLBACKS ====================
@@ -6687,7 +7253,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data.startswith('report_post_'):
             try:
                 post_id = int(query.data.split('_')[2])
-                post = db_fetch_one("SELECT post_id FROM posts WHERE post_id = %s", (post_id,))
+                post = await db_fetch_one_async("SELECT post_id FROM posts WHERE post_id = %s", (post_id,))
                 if not post:
                     await query.answer("❌ Post not found.", show_alert=True)
                     return
@@ -6705,7 +7271,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data.startswith('report_comment_'):
             try:
                 comment_id = int(query.data.split('_')[2])
-                comment = db_fetch_one("SELECT comment_id FROM comments WHERE comment_id = %s", (comment_id,))
+                comment = await db_fetch_one_async("SELECT comment_id FROM comments WHERE comment_id = %s", (comment_id,))
                 if not comment:
                     await query.answer("❌ Comment not found.", show_alert=True)
                     return
@@ -6734,15 +7300,15 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data.startswith('report_view_'):
             try:
                 report_id = int(query.data.split('_')[2])
-                report = db_fetch_one("SELECT * FROM reports WHERE report_id = %s", (report_id,))
+                report = await db_fetch_one_async("SELECT * FROM reports WHERE report_id = %s", (report_id,))
                 if not report:
                     await query.answer("❌ Report not found.", show_alert=True)
                     return
-                preview, author_id = get_report_content_preview(report['target_type'], report['target_id'])
+                preview, author_id = await run_db(get_report_content_preview, report['target_type'], report['target_id'])
                 type_label = "Post" if report['target_type'] == 'post' else "Comment"
                 preview_text = html.escape(preview or '[Content deleted]')
                 safe_reason = html.escape(report['reason'])
-                reporter = db_fetch_one("SELECT anonymous_name FROM users WHERE user_id = %s", (report['reporter_id'],))
+                reporter = await db_fetch_one_async("SELECT anonymous_name FROM users WHERE user_id = %s", (report['reporter_id'],))
                 reporter_name = html.escape(reporter['anonymous_name'] if reporter else 'Anonymous')
                 view_text = (
                     f"🔍 <b>Report #{report_id}</b>\n"
@@ -6770,7 +7336,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data.startswith('report_dismiss_'):
             try:
                 report_id = int(query.data.split('_')[2])
-                resolve_report(report_id, user_id, 'dismissed', None)
+                await run_db(resolve_report, report_id, user_id, 'dismissed', None)
                 await query.answer("✅ Report dismissed.", show_alert=False)
                 await show_admin_reports(update, context, page=1)
             except Exception as e:
@@ -6780,7 +7346,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data.startswith('report_delete_'):
             try:
                 report_id = int(query.data.split('_')[2])
-                report = db_fetch_one("SELECT * FROM reports WHERE report_id = %s", (report_id,))
+                report = await db_fetch_one_async("SELECT * FROM reports WHERE report_id = %s", (report_id,))
                 if not report:
                     await query.answer("❌ Report not found.", show_alert=True)
                     return
@@ -6791,7 +7357,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
                 if target_type == 'post':
                     # ---------- DELETE POST ----------
-                    post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (target_id,))
+                    post = await db_fetch_one_async("SELECT * FROM posts WHERE post_id = %s", (target_id,))
                     if not post:
                         await query.answer("❌ Post already deleted.", show_alert=True)
                         return
@@ -6819,11 +7385,12 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                                 logger.error(f"Also failed to edit channel message: {edit_err}")
         
                     # 2. Delete all associated data (comments, reactions, categories)
-                    db_execute("DELETE FROM reactions WHERE comment_id IN (SELECT comment_id FROM comments WHERE post_id = %s)", (target_id,))
-                    db_execute("DELETE FROM comments WHERE post_id = %s", (target_id,))
-                    db_execute("DELETE FROM post_categories WHERE post_id = %s", (target_id,))
+                    await db_execute_async("DELETE FROM reactions WHERE comment_id IN (SELECT comment_id FROM comments WHERE post_id = %s)", (target_id,))
+                    await db_execute_async("DELETE FROM comments WHERE post_id = %s", (target_id,))
+                    await db_execute_async("DELETE FROM post_categories WHERE post_id = %s", (target_id,))
                     # 3. Delete the post itself, verify it's gone
-                    deleted = db_execute("DELETE FROM posts WHERE post_id = %s RETURNING post_id", (target_id,), fetchone=True)
+                    deleted = await db_execute_async("DELETE FROM posts WHERE post_id = %s RETURNING post_id", (target_id,), fetchone=True)
+                    clear_post_caches()
                     if not deleted:
                         raise Exception("Post deletion from database failed (no rows returned)")
         
@@ -6832,18 +7399,14 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
                 elif target_type == 'comment':
                     # ---------- DELETE COMMENT ----------
-                    comment = db_fetch_one("SELECT * FROM comments WHERE comment_id = %s", (target_id,))
+                    comment = await db_fetch_one_async("SELECT post_id, author_id FROM comments WHERE comment_id = %s", (target_id,))
                     if not comment:
                         await query.answer("❌ Comment already deleted.", show_alert=True)
                         return
         
                     post_id = comment['post_id']
-                    # 1. Re‑parent child comments to top level
-                    db_execute("UPDATE comments SET parent_comment_id = 0 WHERE parent_comment_id = %s", (target_id,))
-                    # 2. Delete reactions and the comment itself
-                    db_execute("DELETE FROM reactions WHERE comment_id = %s", (target_id,))
-                    deleted = db_execute("DELETE FROM comments WHERE comment_id = %s RETURNING comment_id", (target_id,), fetchone=True)
-                    if not deleted:
+                    # 1-2. Re‑parent child comments, delete reactions and the comment itself
+                    if await run_db(delete_comment, target_id) is None:
                         raise Exception("Comment deletion from database failed (no rows returned)")
         
                     # 3. Update comment count and channel button
@@ -6857,11 +7420,10 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     return
         
                 # ---------- AFTER DELETION: update report, clear caches, notify author ----------
-                resolve_report(report_id, user_id, 'action_taken', 'deleted')
+                await run_db(resolve_report, report_id, user_id, 'action_taken', 'deleted')
         
                 # Clear aura caches (important for leaderboard updates)
-                calculate_user_rating.cache_clear()
-                format_aura.cache_clear()
+                clear_rating_caches()
         
                 # Notify the content author (if we have an author_id and it's not the admin themselves)
                 if author_id and str(author_id) != str(user_id):
@@ -6883,18 +7445,19 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif query.data.startswith('report_warn_'):
             try:
                 report_id = int(query.data.split('_')[2])
-                report = db_fetch_one("SELECT * FROM reports WHERE report_id = %s", (report_id,))
+                report = await db_fetch_one_async("SELECT * FROM reports WHERE report_id = %s", (report_id,))
                 if not report:
                     await query.answer("❌ Report not found.", show_alert=True)
                     return
-                _, author_id = get_report_content_preview(report['target_type'], report['target_id'])
-                resolve_report(report_id, user_id, 'action_taken', 'warned')
+                _, author_id = await run_db(get_report_content_preview, report['target_type'], report['target_id'])
+                await run_db(resolve_report, report_id, user_id, 'action_taken', 'warned')
                 if author_id:
                     # Increment warning count
-                    db_execute(
+                    await db_execute_async(
                         "UPDATE users SET warning_count = COALESCE(warning_count, 0) + 1 WHERE user_id = %s",
                         (author_id,)
                     )
+                    invalidate_user(author_id)
                     try:
                         await context.bot.send_message(
                             chat_id=author_id,
@@ -6977,8 +7540,12 @@ async def show_admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text or update.message.caption or ""
+    # Static reply needs no user row, so answer it before any DB work
+    if text == "❓ Help":
+        await update.message.reply_text(HELP_TEXT, parse_mode=ParseMode.MARKDOWN)
+        return
     user_id = str(update.effective_user.id)
-    user = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+    user = await get_user_async(user_id)
     
 
     # Handle cancel command or main menu buttons while in an input state
@@ -6989,8 +7556,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # We pass None for chat_id to reset quietly, as we'll send the specific menu next
         await reset_user_waiting_states(user_id, None, context)
         
-        # Reload user object from DB to ensure subsequent flags are FALSE
-        user = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+        # Apply the same reset to the row we already hold instead of re-reading it
+        if user:
+            user = {**user, **CLEARED_WAITING_STATE}
         
         # Early exit for explicit cancellation
         if text in ["❌ Cancel", "/cancel"] or text.lower() == "cancel":
@@ -7031,7 +7599,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         target_type = reporting['type']
         target_id = reporting['id']
 
-        report_id = create_report(user_id, target_type, target_id, reason)
+        report_id = await run_db(create_report, user_id, target_type, target_id, reason)
 
         if report_id is None:
             await update.message.reply_text(
@@ -7064,11 +7632,11 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if 'editing_comment' in context.user_data:
         if text in main_menu_buttons: return
         comment_id = context.user_data['editing_comment']
-        comment = db_fetch_one("SELECT * FROM comments WHERE comment_id = %s", (comment_id,))
+        comment = await db_fetch_one_async("SELECT author_id, type FROM comments WHERE comment_id = %s", (comment_id,))
         
         if comment and comment['author_id'] == user_id and comment['type'] == 'text':
             # Update the comment
-            db_execute(
+            await db_execute_async(
                 "UPDATE comments SET content = %s WHERE comment_id = %s",
                 (text, comment_id)
             )
@@ -7129,20 +7697,18 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not user:
         anon = create_anonymous_name(user_id)
         is_admin = str(user_id) == str(ADMIN_ID)
-        db_execute(
+        await db_execute_async(
             "INSERT INTO users (user_id, anonymous_name, sex, is_admin) VALUES (%s, %s, %s, %s)",
             (user_id, anon, '👤', is_admin)
         )
-        user = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+        user = await get_user_async(user_id)
 
     # NEW: Check if we have a thread_from_post_id for continuation
     thread_from_post_id = context.user_data.get('thread_from_post_id')
-    if not thread_from_post_id:
-        # Fallback to database
-        user_db = db_fetch_one("SELECT thread_context_post_id FROM users WHERE user_id = %s", (user_id,))
-        if user_db and user_db.get('thread_context_post_id'):
-            thread_from_post_id = user_db['thread_context_post_id']
-            context.user_data['thread_from_post_id'] = thread_from_post_id
+    if not thread_from_post_id and user and user.get('thread_context_post_id'):
+        # Fallback to the stored state on the cached user row
+        thread_from_post_id = user['thread_context_post_id']
+        context.user_data['thread_from_post_id'] = thread_from_post_id
     
     if user and user['waiting_for_post']:
         if text in main_menu_buttons: return
@@ -7152,7 +7718,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
         if not category:
             await update.message.reply_text("❌ No categories selected. Please start over.", reply_markup=get_main_menu(user_id))
-            db_execute("UPDATE users SET waiting_for_post = FALSE WHERE user_id = %s", (user_id,))
+            await update_user_async(user_id, waiting_for_post=False)
             return
 
         post_content = ""
@@ -7179,17 +7745,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             
             # FIX: Reset user state for BOTH text and media posts
-            db_execute(
-                "UPDATE users SET waiting_for_post = FALSE, selected_categories = NULL, selected_category = NULL WHERE user_id = %s",
-                (user_id,)
-            )
+            await update_user_async(user_id, waiting_for_post=False, selected_categories=None, selected_category=None)
             
             # Send confirmation
             await send_post_confirmation(update, context, post_content, category, media_type, media_id, thread_from_post_id=thread_from_post_id)
             
             # Clear thread context from DB after it's been passed to confirmation
             if thread_from_post_id:
-                db_execute("UPDATE users SET thread_context_post_id = NULL WHERE user_id = %s", (user_id,))
+                await update_user_async(user_id, thread_context_post_id=None)
             return
         except Exception as e:
             logger.error(f"Error reading media: {e}")
@@ -7199,10 +7762,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             )
             # Reset state on error
-            db_execute(
-                "UPDATE users SET waiting_for_post = FALSE, selected_category = NULL WHERE user_id = %s",
-                (user_id,)
-            )
+            await update_user_async(user_id, waiting_for_post=False, selected_category=None)
             return
 
     elif user and user['waiting_for_comment']:
@@ -7247,30 +7807,19 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ Unsupported comment type. Please send text, voice, GIF, sticker, or photo.")
             return
     
-        # Insert new comment
-        db_execute(
-            """INSERT INTO comments
-            (post_id, parent_comment_id, author_id, content, type, file_id)
-            VALUES (%s, %s, %s, %s, %s, %s)""",
-            (post_id, parent_comment_id, user_id, content, comment_type, file_id)
-        )
+        # Insert comment, reset state and bump the count in one transaction
+        post = await run_db(save_comment, post_id, parent_comment_id, user_id, content, comment_type, file_id)
+        invalidate_user(user_id)
         
         # Clear Aura Cache
-        calculate_user_rating.cache_clear()
-        format_aura.cache_clear()
-
-    
-        # Reset state
-        db_execute(
-            "UPDATE users SET waiting_for_comment = FALSE, comment_post_id = NULL, comment_idx = NULL, reply_idx = NULL WHERE user_id = %s",
-            (user_id,)
-        )
+        clear_rating_caches()
     
         await update.message.reply_text("✅ Your comment has been posted!", reply_markup=get_main_menu(user_id))
 
         
-        # Update comment count in background
-        asyncio.create_task(update_channel_post_comment_count(context, post_id))
+        # Update comment count in background, once per burst
+        if post and post['channel_message_id']:
+            schedule_comment_count_refresh(context, post_id)
         
         # Notify vent author if this is a top‑level comment
         if parent_comment_id == 0:
@@ -7287,8 +7836,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         message_content = text
         
         # Check if blocked
-        is_blocked = db_fetch_one(
-            "SELECT * FROM blocks WHERE blocker_id = %s AND blocked_id = %s",
+        is_blocked = await db_fetch_one_async(
+            "SELECT 1 FROM blocks WHERE blocker_id = %s AND blocked_id = %s",
             (target_id, user_id)
         )
         
@@ -7299,24 +7848,11 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
 
 
-            db_execute(
-                "UPDATE users SET waiting_for_private_message = FALSE, private_message_target = NULL WHERE user_id = %s",
-                (user_id,)
-            )
+            await update_user_async(user_id, waiting_for_private_message=False, private_message_target=None)
             return
         
-        # Save message
-        message_row = db_execute(
-            "INSERT INTO private_messages (sender_id, receiver_id, content) VALUES (%s, %s, %s) RETURNING message_id",
-            (user_id, target_id, message_content),
-            fetchone=True
-        )
-        
-        # Reset state
-        db_execute(
-            "UPDATE users SET waiting_for_private_message = FALSE, private_message_target = NULL WHERE user_id = %s",
-            (user_id,)
-        )
+        # Save message and reset state in one transaction
+        message_row = await run_db(save_private_message, user_id, target_id, message_content)
         
         # Notify receiver
         await notify_user_of_private_message(context, user_id, target_id, message_content, message_row['message_id'] if message_row else None)
@@ -7333,10 +7869,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if text in main_menu_buttons: return
         new_name = text.strip()
         if new_name and len(new_name) <= 30:
-            db_execute(
-                "UPDATE users SET anonymous_name = %s, awaiting_name = FALSE WHERE user_id = %s",
-                (new_name, user_id)
-            )
+            await update_user_async(user_id, anonymous_name=new_name, awaiting_name=False)
             await update.message.reply_text(
                 f"✅ Name updated to *{new_name}*!", 
                 parse_mode=ParseMode.MARKDOWN,
@@ -7373,7 +7906,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
              await update.message.reply_text("❌ Bio is too long (max 200 chars). Please shorten it.")
              return
              
-        db_execute("UPDATE users SET bio = %s, awaiting_bio = FALSE WHERE user_id = %s", (text, user_id))
+        await update_user_async(user_id, bio=text, awaiting_bio=False)
         await update.message.reply_text("✅ Bio updated successfully!", reply_markup=get_main_menu(user_id))
 
         await send_updated_profile(user_id, update.message.chat.id, context)
@@ -7391,21 +7924,6 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await show_my_content_menu(update, context)  # Show menu instead of direct posts
         return
 
-    elif text == "❓ Help":
-        help_text = (
-            "ℹ️ *How to Use This Bot:*\n"
-            "• Use the menu buttons to navigate.\n"
-            "• Tap 'Share My Thoughts' to share your thoughts anonymously.\n"
-            "• Choose a category and type or send your message (text, photo, or voice).\n"
-            "• After posting, others can comment on your posts.\n"
-            "• View your profile, set your name and sex anytime.\n"
-            "• Use 'My Previous Posts' to view and continue your past posts.\n"
-            "• Use the comments button on channel posts to join the conversation here.\n"
-            "• Follow users to send them private messages."
-        )
-        await update.message.reply_text(help_text, parse_mode=ParseMode.MARKDOWN)
-        return
-
     elif text == "🌐 Open App":
         await mini_app_command(update, context)
         return
@@ -7436,27 +7954,8 @@ async def handle_private_message_text(update: Update, context: ContextTypes.DEFA
         await update.message.reply_text("❌ You cannot message yourself.")
         return
 
-    # Save message
-    msg = db_execute(
-        """
-        INSERT INTO private_messages (sender_id, receiver_id, content)
-        VALUES (%s, %s, %s)
-        RETURNING message_id
-        """,
-        (user_id, receiver_id, text),
-        fetchone=True
-    )
-
-    # Reset reply state
-    db_execute(
-        """
-        UPDATE users
-        SET waiting_for_private_message = FALSE,
-            private_message_target = NULL
-        WHERE user_id = %s
-        """,
-        (user_id,)
-    )
+    # Save message and reset reply state in one transaction
+    msg = await run_db(save_private_message, user_id, receiver_id, text)
 
     # Notify receiver
     await notify_user_of_private_message(
@@ -7475,6 +7974,9 @@ async def error_handler(update, context):
 from telegram import BotCommand 
 
 async def set_bot_commands(app):
+    global bot_application, bot_loop
+    bot_application = app
+    bot_loop = asyncio.get_running_loop()
     commands = [
         BotCommand("start", "Start the bot and open the menu"),
         BotCommand("webapp", "🌐 Open Web App"),
@@ -7557,6 +8059,8 @@ def main():
 
     
     # Create and run Telegram bot
+    # Updates are processed in order (posting/commenting flows rely on it); only the
+    # read-only thread buttons run alongside, via block=False on their handler
     app = Application.builder().token(TOKEN).post_init(set_bot_commands).build()
     
     # Add your handlers
@@ -7577,6 +8081,7 @@ def main():
     app.add_handler(CommandHandler("force_weekly", force_weekly_command))
     app.add_handler(CommandHandler("weekly_status", weekly_status_command))
     
+    app.add_handler(CallbackQueryHandler(thread_view_handler, pattern=NONBLOCKING_THREAD_CALLBACKS, block=False))
     app.add_handler(CallbackQueryHandler(button_handler))
     app.add_handler(MessageHandler(filters.ALL & ~filters.COMMAND, handle_message))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_private_message_text))
@@ -8723,7 +9228,7 @@ def mini_app_submit_vent():
             return jsonify({'success': False, 'error': 'At least one category is required'}), 400
         
         # Check if user exists
-        user = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+        user = get_user(user_id)
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
         
@@ -8733,6 +9238,7 @@ def mini_app_submit_vent():
             (content, user_id),
             fetchone=True
         )
+        clear_post_caches()
         
         if post_row:
             post_id = post_row['post_id']
@@ -8768,14 +9274,14 @@ def notify_admin_of_new_post_sync(post_id):
         if not ADMIN_ID:
             return
         
-        post = db_fetch_one("SELECT * FROM posts WHERE post_id = %s", (post_id,))
+        post = get_post_meta(post_id)
         if not post:
             return
         
-        author = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (post['author_id'],))
+        author = get_user(post['author_id'])
         author_name = get_display_name(author)
         
-        post_preview = post['content'][:100] + '...' if len(post['content']) > 100 else post['content']
+        post_preview = clip_text(post['preview'], 100)
         
         logger.info(f"🆕 Mini App Post awaiting approval from {author_name}: {post_preview}")
         
@@ -8796,29 +9302,6 @@ def notify_admin_of_new_post_sync(post_id):
     except Exception as e:
         logger.error(f"Error in sync admin notification: {e}")
 
-def update_channel_post_comment_count_sync(post_id):
-    """Sync version of update_channel_post_comment_count for the mini app"""
-    try:
-        post = db_fetch_one("SELECT channel_message_id FROM posts WHERE post_id = %s", (post_id,))
-        if not post or not post['channel_message_id']:
-            return
-            
-        total_comments = count_all_comments(post_id)
-        
-        url = f"https://api.telegram.org/bot{TOKEN}/editMessageReplyMarkup"
-        payload = {
-            "chat_id": CHANNEL_ID,
-            "message_id": post['channel_message_id'],
-            "reply_markup": {
-                "inline_keyboard": [
-                    [{"text": f"💬 Add/view Comments ({total_comments})", "url": f"https://t.me/{BOT_USERNAME}?start=comments_{post_id}"}]
-                ]
-            }
-        }
-        requests.post(url, json=payload, timeout=5)
-    except Exception as e:
-        logger.error(f"Error in sync channel comment update: {e}")
-
 @flask_app.route('/api/mini-app/get-posts', methods=['GET'])
 def mini_app_get_posts():
     """API endpoint for getting posts from mini app - With Pagination and Unread Counts"""
@@ -8861,38 +9344,10 @@ def mini_app_get_posts():
         ''', (user_id, per_page, offset))
         
         # Batch load reactions for posts
-        post_ids = [p['post_id'] for p in posts]
-        reactions_map = {}
-        user_reactions_map = {}
-        
-        if post_ids:
-            counts_res = db_fetch_all("""
-                SELECT post_id, type, COUNT(*) as cnt
-                FROM reactions
-                WHERE post_id IN %s AND post_id IS NOT NULL
-                GROUP BY post_id, type
-            """, (tuple(post_ids),))
-            
-            for row in (counts_res or []):
-                pid = row['post_id']
-                rtype = row['type']
-                rcnt = row['cnt']
-                if pid not in reactions_map:
-                    reactions_map[pid] = {}
-                reactions_map[pid][rtype] = rcnt
-                
-            if user_id:
-                user_res = db_fetch_all("""
-                    SELECT post_id, type
-                    FROM reactions
-                    WHERE post_id IN %s AND user_id = %s AND post_id IS NOT NULL
-                """, (tuple(post_ids), str(user_id)))
-                
-                for row in (user_res or []):
-                    pid = row['post_id']
-                    rtype = row['type']
-                    user_reactions_map[pid] = rtype
+        # Per-type counts and the viewer's reaction for every post in one grouped query
+        reactions_map, user_reactions_map = get_emoji_reactions('post_id', (p['post_id'] for p in posts), user_id)
 
+        ratings = calculate_user_ratings(p['author_id'] for p in posts)
         formatted_posts = []
         for post in posts:
             if isinstance(post['timestamp'], str):
@@ -8917,7 +9372,7 @@ def mini_app_get_posts():
             if len(content_preview) > 300:
                 content_preview = content_preview[:297] + '...'
             
-            rating = calculate_user_rating(post['author_id'])
+            rating = ratings.get(str(post['author_id']), 0)
             aura_sticker = "🔵" if post['author_is_admin'] else format_aura(rating)
             
             category_list = post['categories'].split(',') if post['categories'] else ['Other']
@@ -9098,39 +9553,12 @@ def mini_app_get_post_comments(post_id):
         viewer_id = request.args.get('viewer_id')
         
         # Batch load reactions for comments
-        comment_ids = [c['comment_id'] for c in comments]
-        comment_reactions_map = {}
-        comment_user_reactions_map = {}
-        
-        if comment_ids:
-            counts_res = db_fetch_all("""
-                SELECT comment_id, type, COUNT(*) as cnt
-                FROM reactions
-                WHERE comment_id IN %s AND comment_id IS NOT NULL
-                GROUP BY comment_id, type
-            """, (tuple(comment_ids),))
-            
-            for row in (counts_res or []):
-                cid = row['comment_id']
-                rtype = row['type']
-                rcnt = row['cnt']
-                if cid not in comment_reactions_map:
-                    comment_reactions_map[cid] = {}
-                comment_reactions_map[cid][rtype] = rcnt
-                
-            if viewer_id:
-                user_res = db_fetch_all("""
-                    SELECT comment_id, type
-                    FROM reactions
-                    WHERE comment_id IN %s AND user_id = %s AND comment_id IS NOT NULL
-                """, (tuple(comment_ids), str(viewer_id)))
-                
-                for row in (user_res or []):
-                    cid = row['comment_id']
-                    rtype = row['type']
-                    comment_user_reactions_map[cid] = rtype
-        post_author = db_fetch_one("SELECT author_id FROM posts WHERE post_id = %s", (post_id,))
+        comment_reactions_map, comment_user_reactions_map = get_emoji_reactions(
+            'comment_id', (c['comment_id'] for c in comments), viewer_id
+        )
+        post_author = get_post_meta(post_id)
         post_author_id = post_author['author_id'] if post_author else None
+        ratings = calculate_user_ratings(c['author_id'] for c in comments)
         formatted_comments = []
         now = datetime.now()
         for c in comments:
@@ -9149,7 +9577,7 @@ def mini_app_get_post_comments(post_id):
             else:
                 calc_time = "Just now"
 
-            rating = calculate_user_rating(c['author_id'])
+            rating = ratings.get(str(c['author_id']), 0)
 
             formatted_comments.append({
                 'id': c['comment_id'],
@@ -9191,17 +9619,19 @@ def mini_app_submit_comment(post_id):
         if not content:
             return jsonify({'success': False, 'error': 'Empty response'}), 400
 
-        db_execute(
-            "INSERT INTO comments (post_id, author_id, content, parent_comment_id) VALUES (%s, %s, %s, %s)",
-            (post_id, user_id, content, parent_comment_id)
-        )
-        db_execute(
-            "UPDATE posts SET comment_count = COALESCE(comment_count, 0) + 1 WHERE post_id = %s",
-            (post_id,)
-        )
+        # Insert and count bump commit together, like save_comment
+        with db_transaction() as cur:
+            cur.execute(
+                "INSERT INTO comments (post_id, author_id, content, parent_comment_id) VALUES (%s, %s, %s, %s)",
+                (post_id, user_id, content, parent_comment_id)
+            )
+            cur.execute(
+                "UPDATE posts SET comment_count = COALESCE(comment_count, 0) + 1 WHERE post_id = %s",
+                (post_id,)
+            )
 
-        # Update Channel Message Inline Keyboard immediately
-        update_channel_post_comment_count_sync(post_id)
+        # Refresh the channel button through the bot's debounced, per-post path
+        schedule_comment_count_refresh_threadsafe(post_id)
 
         return jsonify({'success': True, 'message': 'Reply posted successfully!'})
     except Exception as e:
@@ -9223,64 +9653,20 @@ def mini_app_toggle_reaction():
         if post_id is None and comment_id is None:
             return jsonify({'success': False, 'error': 'Must provide post_id or comment_id'}), 400
             
-        # Toggle logic
+        # Toggle, recount and read back in one transaction
         if post_id is not None:
-            existing = db_fetch_one(
-                "SELECT type FROM reactions WHERE post_id = %s AND user_id = %s",
-                (post_id, user_id)
-            )
-            if existing:
-                if existing['type'] == reaction_type:
-                    db_execute("DELETE FROM reactions WHERE post_id = %s AND user_id = %s", (post_id, user_id))
-                    action = 'removed'
-                else:
-                    db_execute("UPDATE reactions SET type = %s WHERE post_id = %s AND user_id = %s", (reaction_type, post_id, user_id))
-                    action = 'updated'
-            else:
-                db_execute("INSERT INTO reactions (post_id, user_id, type) VALUES (%s, %s, %s)", (post_id, user_id, reaction_type))
-                action = 'added'
-                
-            # Get updated counts
-            counts_res = db_fetch_all(
-                "SELECT type, COUNT(*) as cnt FROM reactions WHERE post_id = %s GROUP BY type",
-                (post_id,)
-            )
-            counts = {row['type']: row['cnt'] for row in (counts_res or [])}
-            
-            # Fetch current reaction
-            cur_res = db_fetch_one("SELECT type FROM reactions WHERE post_id = %s AND user_id = %s", (post_id, user_id))
-            user_reaction = cur_res['type'] if cur_res else None
-            
+            action, counts, user_reaction = toggle_reaction('post_id', post_id, user_id, reaction_type)
+            target = get_post_meta(int(post_id))
         else:
-            existing = db_fetch_one(
-                "SELECT type FROM reactions WHERE comment_id = %s AND user_id = %s",
-                (comment_id, user_id)
-            )
-            if existing:
-                if existing['type'] == reaction_type:
-                    db_execute("DELETE FROM reactions WHERE comment_id = %s AND user_id = %s", (comment_id, user_id))
-                    action = 'removed'
-                else:
-                    db_execute("UPDATE reactions SET type = %s WHERE comment_id = %s AND user_id = %s", (reaction_type, comment_id, user_id))
-                    action = 'updated'
-            else:
-                db_execute("INSERT INTO reactions (comment_id, user_id, type) VALUES (%s, %s, %s)", (comment_id, user_id, reaction_type))
-                action = 'added'
-                
-            # Get updated counts
-            counts_res = db_fetch_all(
-                "SELECT type, COUNT(*) as cnt FROM reactions WHERE comment_id = %s GROUP BY type",
-                (comment_id,)
-            )
-            counts = {row['type']: row['cnt'] for row in (counts_res or [])}
+            action, counts, user_reaction = toggle_reaction('comment_id', comment_id, user_id, reaction_type)
+            forget_comment_reaction_counts(comment_id)
+            target = db_fetch_one("SELECT author_id FROM comments WHERE comment_id = %s", (comment_id,))
             
-            # Fetch current reaction
-            cur_res = db_fetch_one("SELECT type FROM reactions WHERE comment_id = %s AND user_id = %s", (comment_id, user_id))
-            user_reaction = cur_res['type'] if cur_res else None
-            
-        # Clear rating caches since aura changes
-        calculate_user_rating.cache_clear()
-        format_aura.cache_clear()
+        # Only the target author's aura changes
+        if target:
+            forget_user_rating(target['author_id'])
+        else:
+            clear_rating_caches()
         
         return jsonify({
             'success': True,
@@ -9505,7 +9891,7 @@ def mini_app_send_message():
                             {"text": "⛔ Block", "callback_data": f"block_user_{sender_id}"}
                         ],
                         [
-                            {"text": "👤 View Profile", "url": f"https://t.me/{BOT_USERNAME}?start=profileid_{sender_id}"}
+                            {"text": "👤 View Profile", "url": f"{PROFILE_URL_PREFIX}{sender_id}"}
                         ]
                     ]
                 }
@@ -9603,7 +9989,7 @@ def mini_app_send_chat_request():
                         {"text": "❌ Decline", "callback_data": f"declinechat_{sender_id}"}
                     ],
                     [
-                        {"text": "👤 View Profile", "url": f"https://t.me/{BOT_USERNAME}?start=profileid_{sender_id}"}
+                        {"text": "👤 View Profile", "url": f"{PROFILE_URL_PREFIX}{sender_id}"}
                     ]
                 ]
             },
@@ -9619,29 +10005,7 @@ def mini_app_leaderboard():
     """API endpoint for leaderboard data"""
     try:
         # Get top 10 users with weighted aura
-        top_users = db_fetch_all('''
-            SELECT 
-                u.user_id,
-                u.anonymous_name,
-                u.sex,
-                u.avatar_emoji,
-                u.weekly_badge,
-                (
-                    (SELECT COUNT(*) FROM posts p WHERE p.author_id = u.user_id AND p.approved = TRUE) * 10 +
-                    (SELECT COUNT(*) FROM comments c WHERE c.author_id = u.user_id) * 2 +
-                    COALESCE((
-                        SELECT SUM(CASE WHEN r.type = 'like' THEN 1 WHEN r.type = 'dislike' THEN -2 ELSE 0 END)
-                        FROM reactions r
-                        JOIN comments c2 ON r.comment_id = c2.comment_id
-                        WHERE c2.author_id = u.user_id
-                    ), 0) -
-                    (SELECT COUNT(*) FROM blocks b WHERE b.blocked_id = u.user_id) * 10
-                ) as total
-            FROM users u
-            WHERE u.is_admin = FALSE
-            ORDER BY total DESC
-            LIMIT 10
-        ''')
+        top_users = get_leaderboard_ranking()[0][:10]
 
         
         # Format users
@@ -9673,7 +10037,7 @@ def mini_app_leaderboard():
 def mini_app_profile(user_id):
     """API endpoint for user profile"""
     try:
-        user = db_fetch_one("SELECT * FROM users WHERE user_id = %s", (user_id,))
+        user = get_user(user_id)
         
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
@@ -9831,12 +10195,13 @@ def mini_app_search():
         
         posts = db_fetch_all(sql, tuple(params))
         
+        ratings = calculate_user_ratings(p['author_id'] for p in posts)
         formatted_posts = []
         for post in posts:
-            rating = calculate_user_rating(post['author_id'])
+            rating = ratings.get(str(post['author_id']), 0)
             formatted_posts.append({
                 'id': post['post_id'],
-                'content': post['content'][:300] + '...' if len(post['content']) > 300 else post['content'],
+                'content': clip_text(post['content'], 300),
                 'categories': post['categories'].split(',') if post['categories'] else [],
                 'comments': post['comment_count'] or 0,
                 'author': {
@@ -9863,10 +10228,7 @@ def mini_app_update_profile(user_id):
         if not name:
             return jsonify({'success': False, 'error': 'Name is required'}), 400
             
-        db_execute(
-            "UPDATE users SET anonymous_name = %s, bio = %s, avatar_emoji = %s WHERE user_id = %s",
-            (name, bio, avatar, user_id)
-        )
+        update_user(user_id, anonymous_name=name, bio=bio, avatar_emoji=avatar)
         
         return jsonify({'success': True, 'message': 'Profile updated successfully'})
     except Exception as e:
@@ -9906,15 +10268,12 @@ def mini_app_delete_comment(comment_id):
             
         post_id = comment['post_id']
         
-        # Cascade re-parent child comments
-        db_execute("UPDATE comments SET parent_comment_id = 0 WHERE parent_comment_id = %s", (comment_id,))
-        # Delete reactions and comment
-        db_execute("DELETE FROM reactions WHERE comment_id = %s", (comment_id,))
-        db_execute("DELETE FROM comments WHERE comment_id = %s", (comment_id,))
+        # Re-parent child comments, delete reactions and the comment in one transaction
+        delete_comment(comment_id)
         
         # Update post comment count
         db_execute("UPDATE posts SET comment_count = (SELECT COUNT(*) FROM comments WHERE post_id = %s) WHERE post_id = %s", (post_id, post_id))
-        update_channel_post_comment_count_sync(post_id)
+        schedule_comment_count_refresh_threadsafe(post_id)
         
         return jsonify({'success': True, 'message': 'Comment deleted'})
     except Exception as e:
@@ -9984,6 +10343,7 @@ def mini_app_update_settings(user_id):
             
         params.append(user_id)
         db_execute(f"UPDATE users SET {', '.join(updates)} WHERE user_id = %s", tuple(params))
+        invalidate_user(user_id)
         
         return jsonify({'success': True, 'message': 'Settings updated'})
     except Exception as e: